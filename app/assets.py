@@ -0,0 +1,124 @@
+"""Fingerprinted, precompressed static assets and the cached SPA shell.
+
+    python -m app.assets   # build static/dist/ (run on deploy)
+
+The build copies each asset to static/dist/ under a content-hashed name
+(app.3f9c2a1b7d0e.js) next to .gz and, when the brotli package is
+installed, .br variants, and records the mapping in manifest.json. Hashed
+files never change, so they are served with a year-long immutable
+Cache-Control; the shell picks up new names on the next deploy.
+
+Without a build the shell falls back to the plain /static paths.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from typing import Optional
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are built
+    brotli = None
+
+STATIC_DIR = "static"
+DIST = "dist"
+ASSETS = ["js/app.js", "css/style.css", "css/auth.css"]
+IMMUTABLE = "public, max-age=31536000, immutable"
+# (Accept-Encoding token, file suffix), preferred first
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+def build_assets(static_dir: str = STATIC_DIR) -> dict[str, str]:
+    """Write hashed + compressed copies of ASSETS; returns the manifest."""
+    out_dir = os.path.join(static_dir, DIST)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    manifest = {}
+    for asset in ASSETS:
+        with open(os.path.join(static_dir, asset), "rb") as f:
+            data = f.read()
+        root, ext = os.path.splitext(asset)
+        hashed = f"{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        target = os.path.join(out_dir, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+        with open(target + ".gz", "wb") as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(target + ".br", "wb") as f:
+                f.write(brotli.compress(data, quality=11))
+        manifest[asset] = f"{DIST}/{hashed}"
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def load_manifest(static_dir: str = STATIC_DIR) -> dict[str, str]:
+    try:
+        with open(os.path.join(static_dir, DIST, "manifest.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+class Shell:
+    """index.html rendered once, served from memory with an ETag."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+
+    @classmethod
+    def render(cls, templates, manifest: dict[str, str]) -> "Shell":
+        def asset(path: str) -> str:
+            return f"/static/{manifest.get(path, path)}"
+        return cls(templates.get_template("index.html").render(asset=asset).encode("utf-8"))
+
+    def response(self, if_none_match: Optional[str]) -> Response:
+        # no-cache: browsers revalidate every time, which costs a 304 and no body
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if if_none_match and self.etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        return Response(self.body, media_type="text/html", headers=headers)
+
+class AssetFiles(StaticFiles):
+    """StaticFiles that serves precompressed variants and immutable headers for dist/."""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if not path.startswith(DIST + "/"):
+            response.headers.setdefault("Cache-Control", "no-cache")
+            return response
+
+        if response.status_code == 200:
+            accepted = {
+                token.split(";")[0].strip()
+                for token in Headers(scope=scope).get("accept-encoding", "").split(",")
+            }
+            for encoding, suffix in ENCODINGS:
+                if encoding not in accepted:
+                    continue
+                full_path, stat_result = self.lookup_path(path + suffix)
+                if stat_result is None:
+                    continue
+                response = self.file_response(full_path, stat_result, scope)
+                if response.status_code == 200:
+                    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                    if media_type.startswith("text/"):
+                        media_type += "; charset=utf-8"
+                    response.headers["Content-Type"] = media_type
+                    response.headers["Content-Encoding"] = encoding
+                break
+        response.headers["Cache-Control"] = IMMUTABLE
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+if __name__ == "__main__":
+    for source, target in build_assets().items():
+        print(f"{source} -> {target}")
+    if brotli is None:
+        print("brotli not installed: built gzip variants only.")
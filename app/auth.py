@@ -1,3 +1,7 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -5,19 +9,56 @@ import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from app.cache import ResponseCache, get_signal
 from app.config import get_settings
-from app.database import get_db
+from app.database import get_read_db
 from app.models import User
 
 settings = get_settings()
 security = HTTPBearer(auto_error=False)
 
-def verify_password(plain: str, hashed: str) -> bool:
+# bcrypt releases the GIL, so a small pool keeps hashing off the event loop
+# without starving the worker. Work beyond max_pending is refused (503) rather
+# than queued without bound.
+_hash_executor = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt")
+_hash_pending = 0
+
+async def _run_hash(fn, *args):
+    global _hash_pending
+    if _hash_pending >= settings.password_hash_max_pending:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Sunucu meşgul, lütfen tekrar deneyin",
+            headers={"Retry-After": "1"},
+        )
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _hash_pending -= 1
+
+def _checkpw(plain: str, hashed: str) -> bool:
     return bcrypt.checkpw(plain.encode('utf-8'), hashed.encode('utf-8'))
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+def _hashpw(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+async def verify_password(plain: str, hashed: str) -> bool:
+    if not hashed:  # OAuth users have no password
+        return False
+    return await _run_hash(_checkpw, plain, hashed)
+
+async def hash_password(password: str) -> str:
+    return await _run_hash(_hashpw, password, settings.bcrypt_rounds)
+
+def needs_rehash(hashed: str) -> bool:
+    """True when a hash was made with a different work factor than configured."""
+    try:
+        return int(hashed.split('$')[2]) != settings.bcrypt_rounds
+    except (IndexError, ValueError):
+        return False
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -28,14 +69,57 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """What request handlers need to know about the caller; safe to cache."""
+    id: int
+    name: str
+    email: str
+    avatar: Optional[str]
+    provider: str
+
+# Verified token -> UserSnapshot. Entries expire with the token and are
+# filed under users:<id>, so a committed change to that user drops them in
+# every worker.
+identity_cache = ResponseCache(
+    get_signal(),
+    max_entries=settings.identity_cache_max_entries,
+    ttl=settings.identity_cache_ttl_seconds,
+)
+
+def user_tag(user_id: int) -> str:
+    return f"users:{user_id}"
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _track_user_change(mapper, connection, target: User) -> None:
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    changed = session.info.pop("changed_user_ids", None)
+    if changed:
+        identity_cache.invalidate(*(user_tag(user_id) for user_id in changed))
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session) -> None:
+    session.info.pop("changed_user_ids", None)
+
 async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: AsyncSession = Depends(get_db)
-) -> Optional[User]:
+    db: AsyncSession = Depends(get_read_db)
+) -> Optional[UserSnapshot]:
     if not credentials:
         return None
+    token = credentials.credentials
+    snapshot = identity_cache.get(token)
+    if snapshot is not None:
+        return snapshot
+    
     try:
-        payload = jwt.decode(credentials.credentials, settings.secret_key, algorithms=[settings.algorithm])
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         user_id_str = payload.get("sub")
         if user_id_str is None:
             return None
@@ -43,10 +127,21 @@ async def get_current_user(
     except (JWTError, ValueError, TypeError):
         return None
     
+    generation = identity_cache.generation(user_tag(user_id))
     result = await db.execute(select(User).where(User.id == user_id))
-    return result.scalar_one_or_none()
+    user = result.scalar_one_or_none()
+    if not user:
+        return None
+    
+    snapshot = UserSnapshot(
+        id=user.id, name=user.name, email=user.email, avatar=user.avatar, provider=user.provider
+    )
+    expires_in = payload["exp"] - time.time() if "exp" in payload else None
+    if expires_in is None or expires_in > 0:
+        identity_cache.set(token, user_tag(user_id), generation, snapshot, ttl=expires_in)
+    return snapshot
 
-async def require_auth(user: Optional[User] = Depends(get_current_user)) -> User:
+async def require_auth(user: Optional[UserSnapshot] = Depends(get_current_user)) -> UserSnapshot:
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Giriş yapmanız gerekiyor")
     return user
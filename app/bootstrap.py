@@ -0,0 +1,94 @@
+"""One-time schema setup and seeding for a fleet of workers.
+
+STARTUP_MODE decides what each worker's lifespan does:
+
+    worker  every worker runs init_db() and seed_database() (the old behaviour)
+    lock    the first worker to get <data_dir>/bootstrap.lock does the work and
+            leaves a marker; the others wait for the lock, see the marker and
+            go straight to serving (default)
+    skip    workers do nothing; the schema must already be set up, e.g. by
+            gunicorn's on_starting hook or `python -m app.bootstrap`
+
+The marker records a fingerprint of the schema and the database file's
+inode, so a deploy that adds columns or a fresh database file runs the
+bootstrap again.
+"""
+import fcntl
+import hashlib
+import json
+import os
+from sqlalchemy.engine import make_url
+from app.config import get_settings
+
+settings = get_settings()
+
+def _database_path() -> str:
+    database = make_url(settings.database_url).database
+    return None if not database or database == ":memory:" else database
+
+def schema_fingerprint() -> str:
+    from app.database import Base
+    import app.models  # noqa: F401  (registers the tables)
+    shape = [
+        [
+            table.name,
+            sorted(column.name for column in table.columns),
+            sorted([index.name, [column.name for column in index.columns], bool(index.unique)] for index in table.indexes),
+        ]
+        for table in Base.metadata.sorted_tables
+    ]
+    return hashlib.sha1(json.dumps(shape).encode()).hexdigest()
+
+def _marker() -> dict:
+    path = _database_path()
+    return {"schema": schema_fingerprint(), "inode": os.stat(path).st_ino if os.path.exists(path) else None}
+
+def _marker_path() -> str:
+    return os.path.join(settings.data_dir, "bootstrap.done")
+
+def is_bootstrapped() -> bool:
+    try:
+        with open(_marker_path()) as f:
+            return json.load(f) == _marker()
+    except (FileNotFoundError, ValueError):
+        return False
+
+async def _setup() -> None:
+    from app.database import init_db
+    from app.seed import seed_database
+    await init_db()
+    await seed_database()
+
+async def bootstrap() -> bool:
+    """Set up schema and demo data unless already done; True if this call did it."""
+    if _database_path() is None:
+        # In-memory databases are private to each process
+        await _setup()
+        return True
+    if is_bootstrapped():
+        return False
+    fd = os.open(os.path.join(settings.data_dir, "bootstrap.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        if is_bootstrapped():
+            return False
+        await _setup()
+        with open(_marker_path() + ".tmp", "w") as f:
+            json.dump(_marker(), f)
+        os.replace(_marker_path() + ".tmp", _marker_path())
+        return True
+    finally:
+        os.close(fd)
+
+async def on_worker_startup() -> None:
+    mode = settings.startup_mode
+    if mode == "worker":
+        await _setup()
+    elif mode == "lock":
+        await bootstrap()
+    elif mode != "skip":
+        raise ValueError(f"Unknown STARTUP_MODE: {mode}")
+
+if __name__ == "__main__":
+    import asyncio
+    print("Bootstrapped." if asyncio.run(bootstrap()) else "Already bootstrapped.")
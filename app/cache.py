@@ -0,0 +1,105 @@
+"""Read-through response cache shared by all worker processes.
+
+Each worker keeps its own LRU of rendered payloads. Consistency across the
+gunicorn fleet comes from a small memory-mapped file of generation counters:
+every entry remembers the generation of its invalidation tag when it was
+filled, and a write bumps that tag's counter so every worker sees its copy
+as stale on the next lookup.
+"""
+import fcntl
+import mmap
+import os
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Hashable, Optional
+from app.config import get_settings
+
+_SLOT = struct.Struct("<Q")
+
+class InvalidationSignal:
+    """Fixed-size array of 64-bit counters in a file mapped by every worker."""
+
+    def __init__(self, path: str, slots: int = 4096):
+        self.path = path
+        self.slots = slots
+        self._map: Optional[mmap.mmap] = None
+        self._fd: Optional[int] = None
+
+    def _open(self) -> mmap.mmap:
+        if self._map is None:
+            size = self.slots * _SLOT.size
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._fd = fd
+            self._map = mmap.mmap(fd, size)
+        return self._map
+
+    def slot(self, tag: str) -> int:
+        # crc32 rather than hash(): it must agree between processes
+        return zlib.crc32(tag.encode("utf-8")) % self.slots
+
+    def generation(self, tag: str) -> int:
+        return _SLOT.unpack_from(self._open(), self.slot(tag) * _SLOT.size)[0]
+
+    def bump(self, tag: str) -> None:
+        mm = self._open()
+        offset = self.slot(tag) * _SLOT.size
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            _SLOT.pack_into(mm, offset, _SLOT.unpack_from(mm, offset)[0] + 1)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+@lru_cache()
+def get_signal() -> InvalidationSignal:
+    """The signal file shared by every cache in this deployment."""
+    return InvalidationSignal(os.path.join(get_settings().data_dir, "cache.signal"))
+
+class ResponseCache:
+    """Size-bounded LRU with TTL whose entries are validated against a signal."""
+
+    def __init__(self, signal: InvalidationSignal, max_entries: int = 1024, ttl: float = 60.0):
+        self.signal = signal
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[str, int, float, Any]] = OrderedDict()
+
+    def generation(self, tag: str) -> int:
+        """Read before loading from the database and pass the result to set()."""
+        return self.signal.generation(tag)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        tag, generation, expires_at, value = entry
+        if expires_at < time.monotonic() or generation != self.signal.generation(tag):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, tag: str, generation: int, value: Any, ttl: Optional[float] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = (tag, generation, time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *tags: str) -> None:
+        """Mark every entry filed under these tags stale in all workers."""
+        for tag in set(tags):
+            self.signal.bump(tag)
+
+    def clear(self) -> None:
+        self._entries.clear()
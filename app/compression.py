@@ -0,0 +1,213 @@
+"""Opt-in compressed storage for post bodies (posts.content and content_html).
+
+    python -m app.compression [--train] [--vacuum]
+
+With CONTENT_COMPRESSION=zlib, bodies are written as BLOBs: a two-byte
+dictionary id followed by a raw deflate stream primed with that shared
+dictionary (zlib's preset dictionary, trained from the archive's own
+posts), so even short posts compress well. Rows written with compression
+off stay TEXT and both forms are read transparently, so the mode can be
+switched at any time. Decompression happens in the column type, i.e. only
+when a query selects the body: get_post, export, search snippets and
+edits. Listings never select it.
+
+Dictionaries are append-only rows of content_dictionaries, so a row can
+always be read back. A worker loads the newest one the first time it
+compresses and any other the first time it meets it; a freshly trained
+dictionary is used for writes after workers restart.
+
+The command rewrites every body in the configured mode (compressing,
+recompressing with the newest dictionary, or decompressing with
+CONTENT_COMPRESSION=off). --train first trains and stores a new
+dictionary; --vacuum returns the freed pages to the file system.
+"""
+import re
+import sqlite3
+import struct
+import zlib
+from collections import Counter
+from contextlib import closing
+from typing import Optional
+from sqlalchemy import Text
+from sqlalchemy.engine import make_url
+from sqlalchemy.types import TypeDecorator
+from app.config import get_settings
+
+settings = get_settings()
+
+_HEADER = struct.Struct("<H")  # dictionary id, 0 = none
+DICTIONARY_SIZE = 32 * 1024  # deflate's window: a longer dictionary is never referenced
+
+_dictionaries: dict[int, bytes] = {0: b""}
+_newest: Optional[int] = None
+
+def register_dictionary(dictionary_id: int, data: bytes) -> None:
+    """Make a dictionary known to this process and use it for new writes."""
+    global _newest
+    _dictionaries[dictionary_id] = data
+    _newest = max(_newest or 0, dictionary_id)
+
+def _query(sql: str, *parameters) -> Optional[tuple]:
+    # The column type has no connection to use, so dictionaries are read with
+    # a short-lived one; they are small and read once per process.
+    database = make_url(settings.database_url).database
+    if not database or database == ":memory:":
+        return None
+    try:
+        with closing(sqlite3.connect(f"file:{database}?mode=ro", uri=True)) as conn:
+            return conn.execute(sql, parameters).fetchone()
+    except sqlite3.OperationalError:  # no database or table yet
+        return None
+
+def _dictionary(dictionary_id: int) -> bytes:
+    if dictionary_id not in _dictionaries:
+        row = _query("SELECT data FROM content_dictionaries WHERE id = ?", dictionary_id)
+        if row is None:
+            raise LookupError(f"content dictionary {dictionary_id} is missing")
+        _dictionaries[dictionary_id] = row[0]
+    return _dictionaries[dictionary_id]
+
+def _newest_dictionary() -> int:
+    global _newest
+    if _newest is None:
+        row = _query("SELECT id, data FROM content_dictionaries ORDER BY id DESC LIMIT 1")
+        if row is None:
+            _newest = 0
+        else:
+            _newest, _dictionaries[row[0]] = row
+    return _newest
+
+def _zdict(dictionary: bytes) -> dict:
+    # zlib takes no zdict at all rather than an empty one
+    return {"zdict": dictionary} if dictionary else {}
+
+def compress(text: str, dictionary_id: Optional[int] = None) -> bytes | str:
+    """The stored form of text: compressed, unless that would not be smaller."""
+    if dictionary_id is None:
+        dictionary_id = _newest_dictionary()
+    raw = text.encode("utf-8")
+    dictionary = _dictionary(dictionary_id)
+    compressor = zlib.compressobj(settings.content_compression_level, zlib.DEFLATED, -15, **_zdict(dictionary))
+    packed = _HEADER.pack(dictionary_id) + compressor.compress(raw) + compressor.flush()
+    return packed if len(packed) < len(raw) else text
+
+def decompress(value: bytes | str) -> str:
+    if isinstance(value, str):
+        return value
+    (dictionary_id,) = _HEADER.unpack_from(value)
+    decompressor = zlib.decompressobj(-15, **_zdict(_dictionary(dictionary_id)))
+    return (decompressor.decompress(value[_HEADER.size:]) + decompressor.flush()).decode("utf-8")
+
+class CompressedText(TypeDecorator):
+    """Text stored per CONTENT_COMPRESSION; reads either form."""
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or settings.content_compression == "off":
+            return value
+        return compress(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else decompress(value)
+
+def train_dictionary(samples: list[str], size: int = DICTIONARY_SIZE) -> bytes:
+    """A preset dictionary of the runs of words most posts share.
+
+    Runs of one to four words are scored by how many samples contain them
+    times their length, i.e. the bytes they would save across the archive.
+    The best go last, where deflate reaches them with the shortest distances.
+    """
+    seen = Counter()
+    for sample in samples:
+        words = re.findall(r"\s*\S+", sample[:16384])
+        seen.update({"".join(words[i:i + n]) for n in range(1, 5) for i in range(len(words) - n + 1)})
+    ranked = sorted(
+        (run for run, count in seen.items() if count > 1),
+        key=lambda run: seen[run] * len(run.encode("utf-8")),
+        reverse=True,
+    )
+    chosen, total = [], 0
+    for run in ranked:
+        data = run.encode("utf-8")
+        if total + len(data) > size:
+            continue
+        if any(run in longer for longer in chosen[-64:]):
+            continue
+        chosen.append(run)
+        total += len(data)
+    return "".join(reversed(chosen)).encode("utf-8")
+
+async def store_dictionary(db, sample_size: int = 200) -> int:
+    """Train a dictionary on up to sample_size posts spread over the archive."""
+    from sqlalchemy import func, insert, select
+    from app.models import Post, content_dictionaries
+    total = await db.scalar(select(func.count()).select_from(Post)) or 0
+    step = max(1, total // sample_size)
+    result = await db.execute(
+        select(Post.content, Post.content_html).where(Post.id % step == 0).limit(sample_size)
+    )
+    samples = [text for row in result for text in row if text]
+    data = train_dictionary(samples)
+    dictionary_id = (await db.execute(insert(content_dictionaries).values(data=data))).inserted_primary_key[0]
+    await db.commit()
+    register_dictionary(dictionary_id, data)
+    return dictionary_id
+
+async def rewrite_bodies(db, batch_size: int = 500) -> int:
+    """Store every post body again in the configured mode. Returns the post count."""
+    from sqlalchemy import bindparam, select, update
+    from app.models import Post
+    # Core UPDATE: the bodies change form, not value, so updated_at is kept as is
+    statement = (
+        update(Post.__table__)
+        .where(Post.id == bindparam("post_id"))
+        .values(
+            content=bindparam("b_content", type_=Post.content.type),
+            content_html=bindparam("b_content_html", type_=Post.content_html.type),
+            updated_at=Post.updated_at,
+        )
+    )
+    count = 0
+    last_id = 0
+    while True:
+        rows = (await db.execute(
+            select(Post.id, Post.content, Post.content_html).where(Post.id > last_id).order_by(Post.id).limit(batch_size)
+        )).all()
+        if not rows:
+            break
+        await db.execute(statement, [
+            {"post_id": post_id, "b_content": content, "b_content_html": content_html}
+            for post_id, content, content_html in rows
+        ])
+        await db.commit()
+        count += len(rows)
+        last_id = rows[-1].id
+    return count
+
+async def _main(train: bool, vacuum: bool) -> None:
+    from app.database import async_session, init_db
+    await init_db()
+    async with async_session() as db:
+        if train or (settings.content_compression != "off" and not _newest_dictionary()):
+            print(f"Trained content dictionary {await store_dictionary(db)}.")
+        count = await rewrite_bodies(db)
+    print(f"Rewrote {count} post bodies (CONTENT_COMPRESSION={settings.content_compression}).")
+    if vacuum:
+        await vacuum_database()
+
+async def vacuum_database() -> None:
+    """VACUUM, on the driver connection: SQLAlchemy would wrap it in a transaction."""
+    from app.database import engine
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.execute("VACUUM")
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--train", action="store_true", help="train and store a new dictionary first")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to shrink the file")
+    args = parser.parse_args()
+    asyncio.run(_main(args.train, args.vacuum))
@@ -1,19 +1,81 @@
+import os
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from sqlalchemy.engine import make_url
 
 class Settings(BaseSettings):
     app_name: str = "Minimalist Blog"
     debug: bool = False
     secret_key: str = "change-me-in-production"
     database_url: str = "sqlite+aiosqlite:///./blog.db"
+    read_database_url: str = ""  # read-only handlers; default: database_url opened read-only
     host: str = "0.0.0.0"
     port: int = 8000
     allowed_origins: str = "http://localhost:3000"
+    startup_mode: str = "lock"  # worker | lock | skip, see app.bootstrap
+    
+    # SQLite engine profile, applied to every new connection
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size: int = -16000  # negative = KiB, i.e. ~16 MB per connection
+    sqlite_temp_store: str = "memory"
+    db_pool_size: int = 5
+    db_max_overflow: int = 5
+    db_pool_timeout: int = 30
+    # Single writer task (app.writer): queued writes per worker, writes per commit
+    write_queue_max_pending: int = 256
+    write_queue_max_batch: int = 64
     
     # JWT
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60 * 24 * 7  # 7 days
     
+    # Password hashing (bcrypt runs on a bounded thread pool)
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 64
+    
+    # Login/register/OAuth rate limits (token buckets shared by all workers)
+    rate_limit_enabled: bool = True
+    rate_limit_ip_burst: int = 20
+    rate_limit_ip_per_minute: float = 10
+    rate_limit_email_burst: int = 5
+    rate_limit_email_per_minute: float = 2
+    
+    # Response cache (per worker, invalidated across workers)
+    cache_max_entries: int = 1024
+    cache_ttl_seconds: int = 60
+    identity_cache_max_entries: int = 4096
+    identity_cache_ttl_seconds: int = 300
+    
+    # Post body storage (app.compression): off | zlib, and the zlib level
+    content_compression: str = "off"
+    content_compression_level: int = 6
+    
+    # Background jobs (app.jobs): tries per job, first retry delay (doubles
+    # each time), and how often to look for jobs other workers left behind
+    job_max_attempts: int = 5
+    job_retry_seconds: float = 2
+    job_poll_seconds: float = 5
+    
+    # Related posts (app.related): neighbours kept per post, and the gap in
+    # days at which a shared tag counts half
+    related_posts_k: int = 10
+    related_half_life_days: float = 90
+    
+    # Metrics: warn when a single request runs more SQL statements than this (0 = off)
+    metrics_query_warning_threshold: int = 25
+    
+    @property
+    def data_dir(self) -> str:
+        """Directory of the SQLite file; shared runtime files live next to it."""
+        database = make_url(self.database_url).database
+        if not database or database == ":memory:":
+            return "."
+        return os.path.dirname(database) or "."
+    
     class Config:
         env_file = ".env"
         extra = "ignore"
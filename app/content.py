@@ -0,0 +1,286 @@
+"""Write-time content pipeline: Markdown (or editor HTML) to sanitized HTML.
+
+render_content walks the body once and returns the HTML together with the
+word count, read time and excerpt derived from the same plain text, so
+nothing has to be re-rendered or re-parsed when a post is viewed. The
+plain text itself is what app.search indexes.
+"""
+import re
+from dataclasses import dataclass
+from html import escape
+from html.parser import HTMLParser
+from typing import Optional
+
+EXCERPT_LENGTH = 160
+WORDS_PER_MINUTE = 200
+
+@dataclass(frozen=True)
+class RenderedContent:
+    html: str
+    word_count: int
+    read_time: str
+    excerpt: str
+    text: str  # without markup, whitespace collapsed
+
+def is_html(content: str) -> bool:
+    """The rich text editor saves HTML; everything else is Markdown."""
+    return content.lstrip().startswith('<')
+
+def render_content(content: str) -> RenderedContent:
+    html, text = (_sanitize_html if is_html(content) else _render_markdown)(content)
+    text = ' '.join(text.split())
+    words = len(text.split())
+    if len(text) <= EXCERPT_LENGTH:
+        excerpt = text
+    else:
+        excerpt = text[:EXCERPT_LENGTH].rsplit(' ', 1)[0] + '...'
+    return RenderedContent(
+        html=html,
+        word_count=words,
+        read_time=f"{max(1, round(words / WORDS_PER_MINUTE))} dk",
+        excerpt=excerpt,
+        text=text,
+    )
+
+# ============ Markdown ============
+_SAFE_URL = re.compile(r'^(https?:|mailto:|/|#)', re.IGNORECASE)
+_INLINE = re.compile(
+    r'`(?P<code>[^`]+)`'
+    r'|\[(?P<label>[^\]]+)\]\((?P<url>[^)\s]+)\)'
+    r'|\*\*(?P<strong>.+?)\*\*'
+    r'|(?<!\w)__(?P<strong_u>.+?)__(?!\w)'
+    r'|\*(?P<em>[^*]+)\*'
+    r'|(?<!\w)_(?P<em_u>[^_]+)_(?!\w)'  # no intraword _emphasis_ (snake_case)
+)
+_HEADING = re.compile(r'^(#{1,6})\s+(.*)$')
+_BULLET = re.compile(r'^\s*[-*+]\s+(.*)$')
+_ORDERED = re.compile(r'^\s*\d+[.)]\s+(.*)$')
+_RULE = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+
+def _inline(source: str) -> tuple[str, str]:
+    """Render inline markup; returns (html, plain text)."""
+    html, text, pos = [], [], 0
+    for match in _INLINE.finditer(source):
+        html.append(escape(source[pos:match.start()]))
+        text.append(source[pos:match.start()])
+        pos = match.end()
+        if match['code'] is not None:
+            html.append(f"<code>{escape(match['code'])}</code>")
+            text.append(match['code'])
+        elif match['label'] is not None:
+            label_html, label_text = _inline(match['label'])
+            url = match['url']
+            if _SAFE_URL.match(url):
+                html.append(f'<a href="{escape(url)}" rel="noopener">{label_html}</a>')
+            else:
+                html.append(label_html)
+            text.append(label_text)
+        else:
+            tag = 'strong' if match['strong'] is not None or match['strong_u'] is not None else 'em'
+            inner = next(group for group in (match['strong'], match['strong_u'], match['em'], match['em_u']) if group is not None)
+            inner_html, inner_text = _inline(inner)
+            html.append(f"<{tag}>{inner_html}</{tag}>")
+            text.append(inner_text)
+    html.append(escape(source[pos:]))
+    text.append(source[pos:])
+    return ''.join(html), ''.join(text)
+
+def _render_markdown(content: str) -> tuple[str, str]:
+    html: list[str] = []
+    text: list[str] = []
+    paragraph: list[str] = []
+    items: list[str] = []
+    list_tag = None
+    code: Optional[list[str]] = None
+
+    def flush() -> None:
+        nonlocal list_tag
+        if paragraph:
+            rendered = [_inline(line) for line in paragraph]
+            html.append('<p>' + '<br>'.join(h for h, _ in rendered) + '</p>')
+            text.extend(t for _, t in rendered)
+            paragraph.clear()
+        if items:
+            html.append(f'<{list_tag}>' + ''.join(items) + f'</{list_tag}>')
+            items.clear()
+            list_tag = None
+
+    def add_item(tag: str, body: str) -> None:
+        nonlocal list_tag
+        if list_tag != tag:
+            flush()
+            list_tag = tag
+        item_html, item_text = _inline(body)
+        items.append(f'<li>{item_html}</li>')
+        text.append(item_text)
+
+    for line in content.splitlines():
+        if code is not None:
+            if line.strip().startswith('```'):
+                html.append('<pre><code>' + escape('\n'.join(code)) + '</code></pre>')
+                code = None
+            else:
+                code.append(line)
+            continue
+        stripped = line.strip()
+        if stripped.startswith('```'):
+            flush()
+            code = []
+        elif not stripped:
+            flush()
+        elif heading := _HEADING.match(stripped):
+            flush()
+            level = len(heading[1])
+            inner_html, inner_text = _inline(heading[2])
+            html.append(f'<h{level}>{inner_html}</h{level}>')
+            text.append(inner_text)
+        elif _RULE.match(stripped):
+            flush()
+            html.append('<hr>')
+        elif bullet := _BULLET.match(line):
+            add_item('ul', bullet[1])
+        elif ordered := _ORDERED.match(line):
+            add_item('ol', ordered[1])
+        elif stripped.startswith('>'):
+            flush()
+            inner_html, inner_text = _inline(stripped.lstrip('>').strip())
+            html.append(f'<blockquote><p>{inner_html}</p></blockquote>')
+            text.append(inner_text)
+        else:
+            if items:
+                flush()
+            paragraph.append(stripped)
+    if code is not None:  # unterminated fence
+        html.append('<pre><code>' + escape('\n'.join(code)) + '</code></pre>')
+    flush()
+    return '\n'.join(html), ' '.join(text)
+
+# ============ Editor HTML ============
+_ALLOWED_TAGS = {
+    'p', 'br', 'hr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'strong', 'b', 'em', 'i', 'u', 's',
+    'code', 'pre', 'blockquote', 'ul', 'ol', 'li', 'a', 'img', 'span', 'div',
+}
+_VOID_TAGS = {'br', 'hr', 'img'}
+_ALLOWED_ATTRS = {'a': {'href'}, 'img': {'src', 'alt'}}
+_URL_ATTRS = {'href', 'src'}
+_DROP_CONTENT = {'script', 'style', 'iframe', 'object', 'embed', 'template'}
+_BLOCK_TAGS = {'p', 'br', 'hr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre', 'blockquote', 'li', 'div'}
+
+class _Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html: list[str] = []
+        self.text: list[str] = []
+        self.open: list[str] = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _DROP_CONTENT:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in _ALLOWED_TAGS:
+            return
+        if tag in _BLOCK_TAGS:
+            self.text.append(' ')
+        kept = []
+        for name, value in attrs:
+            if name not in _ALLOWED_ATTRS.get(tag, ()) or value is None:
+                continue
+            if name in _URL_ATTRS and not _SAFE_URL.match(value.strip()):
+                continue
+            kept.append(f' {name}="{escape(value)}"')
+        if tag == 'a':
+            kept.append(' rel="noopener"')
+        self.html.append(f"<{tag}{''.join(kept)}>")
+        if tag not in _VOID_TAGS:
+            self.open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _DROP_CONTENT:  # <script/> has no content and no end tag to wait for
+            return
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS and self.open and self.open[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in _DROP_CONTENT:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping or tag not in self.open:
+            return
+        # Close anything left open inside this element so the output nests
+        while self.open:
+            current = self.open.pop()
+            self.html.append(f"</{current}>")
+            if current == tag:
+                break
+        if tag in _BLOCK_TAGS:
+            self.text.append(' ')
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.html.append(escape(data, quote=False))
+            self.text.append(data)
+
+def _sanitize_html(content: str) -> tuple[str, str]:
+    parser = _Sanitizer()
+    parser.feed(content)
+    parser.close()
+    parser.html.extend(f"</{tag}>" for tag in reversed(parser.open))
+    return ''.join(parser.html), ''.join(parser.text)
+
+async def mark_custom_excerpts(db, batch_size: int = 500) -> int:
+    """Set posts.excerpt_custom on posts written before the flag: an excerpt
+    that differs from the derived one was the author's. Returns how many."""
+    from sqlalchemy import select, update
+    from app.models import Post
+    count = 0
+    last_id = 0
+    while True:
+        rows = (await db.execute(
+            select(Post.id, Post.excerpt, Post.content)
+            .where(Post.id > last_id, Post.excerpt.is_not(None), Post.excerpt != "")
+            .order_by(Post.id).limit(batch_size)
+        )).all()
+        if not rows:
+            break
+        custom = [post_id for post_id, excerpt, content in rows if excerpt != render_content(content).excerpt]
+        if custom:
+            await db.execute(update(Post).where(Post.id.in_(custom)).values(excerpt_custom=True))
+        await db.commit()
+        count += len(custom)
+        last_id = rows[-1].id
+    return count
+
+async def backfill_rendered_content(batch_size: int = 500) -> int:
+    """Render posts that predate the pipeline. Returns the number updated."""
+    from sqlalchemy import select
+    from sqlalchemy.orm import undefer
+    from app.database import async_session, init_db
+    from app.models import Post
+    await init_db()
+    count = 0
+    async with async_session() as db:
+        while True:
+            result = await db.execute(
+                select(Post).options(undefer(Post.content))
+                .where(Post.content_html.is_(None)).order_by(Post.id).limit(batch_size)
+            )
+            batch = result.scalars().all()
+            if not batch:
+                break
+            for post in batch:
+                rendered = render_content(post.content)
+                post.content_html = rendered.html
+                post.word_count = rendered.word_count
+                post.read_time = rendered.read_time
+                if not post.excerpt_custom:
+                    post.excerpt = rendered.excerpt
+            await db.commit()
+            db.expunge_all()
+            count += len(batch)
+    return count
+
+if __name__ == "__main__":
+    import asyncio
+    print(f"Rendered {asyncio.run(backfill_rendered_content())} posts.")
@@ -1,11 +1,96 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from typing import Callable
+from sqlalchemy import event, inspect
+from fastapi import Depends, Request
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from app.config import get_settings
+from app.config import Settings, get_settings
 
 settings = get_settings()
 
-engine = create_async_engine(settings.database_url, echo=settings.debug)
+def sqlite_pragmas(settings: Settings) -> dict[str, object]:
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "mmap_size": settings.sqlite_mmap_size,
+        "cache_size": settings.sqlite_cache_size,
+        "temp_store": settings.sqlite_temp_store,
+    }
+
+def is_memory_database(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def read_only_url(url) -> URL:
+    """The same SQLite file opened with mode=ro: the connection can never write or lock it."""
+    url = make_url(url)
+    return url.set(database=f"file:{url.database}", query={**url.query, "mode": "ro", "uri": "true"})
+
+def make_engine(settings: Settings, url: str = None, pool_size: int = None, read_only: bool = False) -> AsyncEngine:
+    """Engine for the configured database with the production SQLite profile."""
+    url = make_url(url or settings.database_url)
+    if read_only and url.get_backend_name() == "sqlite":
+        url = read_only_url(url)
+    options = {}
+    if not is_memory_database(url):
+        # aiosqlite defaults to NullPool (a new connection and thread per
+        # checkout); keep a sized pool instead. In-memory SQLite keeps its
+        # StaticPool, which takes no sizing.
+        options.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=pool_size or settings.db_pool_size,
+            max_overflow=1 if pool_size else settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+        )
+    engine = create_async_engine(url, echo=settings.debug, **options)
+    
+    if engine.dialect.name == "sqlite":
+        pragmas = sqlite_pragmas(settings)
+        if read_only:
+            # The journal mode is the primary's to set
+            del pragmas["journal_mode"]
+            pragmas["query_only"] = "on"
+        
+        @event.listens_for(engine.sync_engine, "connect")
+        def _apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+            # Let SQLAlchemy, not the sqlite3 module, open transactions (below);
+            # otherwise SAVEPOINTs (used by app.writer) commit on release.
+            dbapi_connection.isolation_level = None
+        
+        @event.listens_for(engine.sync_engine, "begin")
+        def _begin(conn):
+            # sqlite_begin="IMMEDIATE" takes the write lock up front (see write_session)
+            conn.exec_driver_sql(f"BEGIN {conn.get_execution_options().get('sqlite_begin', '')}".strip())
+    
+    return engine
+
+engine = make_engine(settings)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# app.writer's sessions. A connection of its own, so the writer never waits
+# behind request sessions that hold the shared pool while awaiting it (an
+# in-memory database has to share the one connection). IMMEDIATE because it
+# reads and then writes: with a deferred BEGIN the upgrade to a write
+# transaction fails at once if another process committed in between.
+write_engine = engine if is_memory_database(settings.database_url) else make_engine(settings, pool_size=1)
+write_session = async_sessionmaker(
+    write_engine.execution_options(sqlite_begin="IMMEDIATE"), class_=AsyncSession, expire_on_commit=False
+)
+# Read-only handlers: their own pool over a mode=ro connection to the same
+# file (or READ_DATABASE_URL, e.g. a replica), so they never queue behind
+# writers for connections. WAL lets them read while a write is in progress.
+if settings.read_database_url:
+    read_engine = make_engine(settings, url=settings.read_database_url, read_only=True)
+elif is_memory_database(settings.database_url):
+    read_engine = engine
+else:
+    read_engine = make_engine(settings, read_only=True)
+read_session = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
 
 class Base(DeclarativeBase):
     pass
@@ -17,6 +102,108 @@ async def get_db():
         finally:
             await session.close()
 
+async def get_read_db(request: Request, db: AsyncSession = Depends(get_db)):
+    """Read-only session for GET/HEAD; anything else gets the request's primary
+    session (the same one get_db gives the handler), so it reads its own writes."""
+    if request.method not in ("GET", "HEAD"):
+        yield db
+        return
+    async with read_session() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+def add_missing_columns(sync_conn) -> set[str]:
+    """Bring tables created by an older version up to date.
+    
+    create_all only creates missing tables; new columns that are nullable or
+    have a server default are added here with ALTER TABLE. Returns the added
+    columns as "table.column".
+    """
+    inspector = inspect(sync_conn)
+    added = set()
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not (column.nullable or column.server_default is not None):
+                continue
+            ddl = f'{column.name} {column.type.compile(dialect=sync_conn.dialect)}'
+            if column.server_default is not None:
+                ddl += ("" if column.nullable else " NOT NULL") + f" DEFAULT {column.server_default.arg}"
+            sync_conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {ddl}')
+            added.add(f"{table.name}.{column.name}")
+    return added
+
+def sync_indexes(sync_conn, before_create: Callable = None) -> set[str]:
+    """Make existing tables' indexes match the models.
+    
+    create_all only indexes the tables it creates. Declared indexes that are
+    missing, or whose columns or uniqueness changed, are (re)created; ix_
+    indexes the models no longer declare are dropped. before_create(names)
+    runs first, e.g. to clear duplicates ahead of a new unique index.
+    Returns the created names.
+    """
+    inspector = inspect(sync_conn)
+    pending = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"]: index for index in inspector.get_indexes(table.name)}
+        declared = {index.name: index for index in table.indexes}
+        for name, index in list(existing.items()):
+            wanted = declared.get(name)
+            if wanted is not None and (
+                index["column_names"] == [column.name for column in wanted.columns]
+                and bool(index["unique"]) == bool(wanted.unique)
+            ):
+                continue
+            if wanted is not None or name.startswith("ix_"):
+                sync_conn.exec_driver_sql(f'DROP INDEX "{name}"')
+                existing.pop(name)
+        pending += [index for name, index in declared.items() if name not in existing]
+    if pending and before_create:
+        before_create(sync_conn, {index.name for index in pending})
+    for index in pending:
+        index.create(sync_conn)
+    return {index.name for index in pending}
+
 async def init_db():
+    from app.tags import dedupe_post_tags, recount_tags
+    from app.related import build_related
+    from app.search import build_search_index
+    from app.content import mark_custom_excerpts
     async with engine.begin() as conn:
+        had_related = await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table("post_related"))
+        had_search = await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table("posts_fts"))
+        had_counters = await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table("counters"))
         await conn.run_sync(Base.metadata.create_all)
+        added = await conn.run_sync(add_missing_columns)
+        if not had_counters:
+            # Counted once here; the triggers in app.models keep it from now on
+            await conn.exec_driver_sql("INSERT INTO counters (name, value) SELECT 'posts', count(*) FROM posts")
+        if "tags.post_count" in added:
+            # Counters start at zero on an upgraded database
+            await conn.run_sync(recount_tags)
+        if "post_tags.post_created_at" in added:
+            await conn.exec_driver_sql(
+                "UPDATE post_tags SET post_created_at = (SELECT created_at FROM posts WHERE id = post_tags.post_id)"
+            )
+        
+        def clear_duplicates(sync_conn, names: set[str]) -> None:
+            if "ix_post_tags_post_id_tag_id" in names:
+                dedupe_post_tags(sync_conn)
+        
+        await conn.run_sync(sync_indexes, clear_duplicates)
+    # Fill new derived tables once for the posts an older version wrote
+    if not had_related:
+        async with async_session() as db:
+            await build_related(db)
+    if not had_search:
+        async with async_session() as db:
+            await build_search_index(db)
+    if "posts.excerpt_custom" in added:
+        async with async_session() as db:
+            await mark_custom_excerpts(db)
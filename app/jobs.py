@@ -0,0 +1,196 @@
+"""Durable background jobs for work derived from a write (an outbox).
+
+    python -m app.jobs   # run every due job now, e.g. after a bulk change
+
+A write operation enqueues its follow-up work in its own transaction, so
+a job exists exactly when the write committed:
+
+    async def op(db: AsyncSession) -> PostResponse:
+        ...
+        await enqueue(db, "search", f"search:{post.id}", {"post_id": post.id})
+
+Jobs are rows of the jobs table. The key is an idempotency key: while a job
+is pending, enqueueing its key again updates that job instead of adding
+one, so a burst of autosaves reindexes a post once. Handlers recompute
+their output from the rows as they are when the job runs, so running a
+job twice is harmless.
+
+One worker task per process drains the table after every commit that
+enqueued something, and every JOB_POLL_SECONDS for jobs due for a retry or
+left behind by another process; a poll that finds nothing due is a plain
+read and never reaches the writer. Jobs run as app.writer operations: each
+is picked, run in a SAVEPOINT and deleted in the operation's transaction
+under SQLite's write lock, so no two workers run the same job. One
+operation runs due jobs until a request's write is waiting, so a burst
+of jobs shares a commit without holding up requests. A job that
+raises is kept with its error and retried after JOB_RETRY_SECONDS,
+doubling each time, up to JOB_MAX_ATTEMPTS tries; enqueueing its key again
+resets it.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.models import jobs
+from app.related import update_related
+from app.search import reindex_post
+from app.writer import LoopTask, write_queue
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+Handler = Callable[[AsyncSession, dict], Awaitable[None]]
+
+async def _search(db: AsyncSession, payload: dict) -> None:
+    await reindex_post(db, payload["post_id"])
+
+async def _related(db: AsyncSession, payload: dict) -> None:
+    await update_related(db, payload["post_id"])
+
+def _invalidate_lists(payload: dict) -> None:
+    # Neighbour lists are cached under the list tag
+    from app.routers.posts import invalidate_posts
+    invalidate_posts()
+
+# kind -> (handler, called after the job's commit)
+HANDLERS: dict[str, tuple[Handler, Optional[Callable[[dict], None]]]] = {
+    "search": (_search, None),
+    "related": (_related, _invalidate_lists),
+}
+
+async def enqueue(db: AsyncSession, kind: str, key: str, payload: dict) -> None:
+    """Add a job to the write's transaction, or bring the pending one with this key up to date."""
+    statement = sqlite_insert(jobs).values(kind=kind, key=key, payload=payload, attempts=0, run_at=datetime.utcnow())
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[jobs.c.key],
+        set_={
+            "kind": statement.excluded.kind,
+            "payload": statement.excluded.payload,
+            "attempts": 0,
+            "run_at": statement.excluded.run_at,
+            "last_error": None,
+        },
+    ))
+    db.info["jobs_enqueued"] = True
+
+@event.listens_for(Session, "after_commit")
+def _wake_worker(session: Session) -> None:
+    if session.info.pop("jobs_enqueued", False):
+        job_worker.wake()
+
+@event.listens_for(Session, "after_rollback")
+def _forget_enqueued(session: Session) -> None:
+    session.info.pop("jobs_enqueued", None)
+
+async def run_next(db: AsyncSession) -> Optional[tuple[str, dict, Optional[Exception]]]:
+    """Run the next due job; returns (kind, payload, error), or None if none is due."""
+    now = datetime.utcnow()
+    job = (await db.execute(
+        select(jobs.c.id, jobs.c.kind, jobs.c.payload, jobs.c.attempts)
+        .where(jobs.c.run_at <= now, jobs.c.attempts < settings.job_max_attempts)
+        .order_by(jobs.c.run_at, jobs.c.id)
+        .limit(1)
+    )).first()
+    if job is None:
+        return None
+    try:
+        handler, _ = HANDLERS[job.kind]
+        async with db.begin_nested():
+            await handler(db, job.payload)
+    except Exception as exc:
+        delay = settings.job_retry_seconds * 2 ** job.attempts
+        await db.execute(
+            update(jobs).where(jobs.c.id == job.id)
+            .values(attempts=job.attempts + 1, run_at=now + timedelta(seconds=delay), last_error=repr(exc))
+        )
+        return job.kind, job.payload, exc
+    await db.execute(delete(jobs).where(jobs.c.id == job.id))
+    return job.kind, job.payload, None
+
+async def run_batch(db: AsyncSession, limit: int = 16) -> list[tuple[str, dict, Optional[Exception]]]:
+    """Run due jobs in one transaction until none is due, limit ran, or a write is waiting."""
+    done = []
+    while len(done) < limit and not (done and write_queue.waiting()):
+        if (result := await run_next(db)) is None:
+            break
+        done.append(result)
+    return done
+
+def _after_commit(kind: str, payload: dict, error: Optional[Exception]) -> None:
+    if error is not None:
+        logger.warning("Job %s %s failed: %r", kind, payload, error)
+    elif HANDLERS[kind][1]:
+        HANDLERS[kind][1](payload)
+
+async def has_due_jobs() -> bool:
+    """Whether a job is due, without taking the write lock."""
+    # The primary, not get_read_db's engine: a replica may not have the job yet
+    from app.database import async_session
+    async with async_session() as db:
+        return await db.scalar(
+            select(jobs.c.id)
+            .where(jobs.c.run_at <= datetime.utcnow(), jobs.c.attempts < settings.job_max_attempts)
+            .limit(1)
+        ) is not None
+
+class JobWorker:
+    def __init__(self, poll_seconds: float = 5.0):
+        self.poll_seconds = poll_seconds
+        self._wake: Optional[asyncio.Event] = None
+        self._runner = LoopTask("job-worker")
+
+    def wake(self) -> None:
+        """Start draining now (called after a commit that enqueued jobs)."""
+        if self._runner.needs_start():
+            self._wake = asyncio.Event()
+            self._runner.start(self._run(self._wake))
+        self._wake.set()
+
+    async def close(self) -> None:
+        """Stop the worker task; pending jobs stay in the table for the next start."""
+        await self._runner.stop()
+
+    async def _run(self, wake: asyncio.Event) -> None:
+        while True:
+            wake.clear()
+            try:
+                # Idle polls stay off the writer: no BEGIN IMMEDIATE, no commit
+                done = await write_queue.submit(run_batch) if await has_due_jobs() else []
+            except Exception:  # e.g. the write queue is full; try again on the next poll
+                logger.exception("Job worker could not run a job")
+                done = []
+            if not done:
+                try:
+                    await asyncio.wait_for(wake.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            for result in done:
+                _after_commit(*result)
+
+job_worker = JobWorker(poll_seconds=settings.job_poll_seconds)
+
+async def run_due_jobs() -> int:
+    """Run every due job in this process; returns how many ran."""
+    from app.database import write_session
+    count = 0
+    async with write_session() as db:
+        while (done := await run_next(db)) is not None:
+            await db.commit()
+            _after_commit(*done)
+            count += 1
+    return count
+
+if __name__ == "__main__":
+    from app.database import init_db
+
+    async def _main() -> None:
+        await init_db()
+        print(f"Ran {await run_due_jobs()} jobs.")
+
+    asyncio.run(_main())
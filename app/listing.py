@@ -0,0 +1,137 @@
+"""Projection-based post listing that never hydrates ORM objects.
+
+Selects only the columns PostListResponse exposes, aggregates each post's
+tags into JSON inside SQLite and serializes rows straight to JSON bytes.
+The output is byte-for-byte what PostListResponse would produce.
+"""
+import hashlib
+import json
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Post, Tag, User, post_related, post_tags
+from app.utils import encode_cursor
+
+# Same settings FastAPI's JSONResponse and pydantic's dump_json use
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+_tags_json = (
+    select(func.json_group_array(func.json_object("id", Tag.id, "name", Tag.name)))
+    .select_from(post_tags.join(Tag, Tag.id == post_tags.c.tag_id))
+    .where(post_tags.c.post_id == Post.id)
+    .scalar_subquery()
+)
+
+_columns = (
+    Post.id, Post.slug, Post.title, Post.excerpt, Post.featured, Post.read_time, Post.created_at,
+    User.id, User.name, User.email, User.avatar, User.provider,
+    _tags_json,
+)
+
+def _row_dict(row) -> dict:
+    # Key order mirrors PostListResponse / UserResponse / TagResponse
+    (post_id, slug, title, excerpt, featured, read_time, created_at,
+     author_id, author_name, author_email, author_avatar, author_provider, tags) = row
+    return {
+        "id": post_id,
+        "slug": slug,
+        "title": title,
+        "excerpt": excerpt,
+        "featured": featured,
+        "read_time": read_time,
+        "created_at": created_at.isoformat(),
+        "author": {
+            "id": author_id,
+            "name": author_name,
+            "email": author_email,
+            "avatar": author_avatar,
+            "provider": author_provider,
+        },
+        "tags": [{"name": t["name"], "id": t["id"]} for t in json.loads(tags)],
+    }
+
+def _page_query(
+    columns, featured: Optional[bool], tag: Optional[str], after: Optional[tuple[datetime, int]], limit: int
+):
+    query = select(*columns)
+    # Keyset order: posts' (created_at, id) index, or for a tag the same
+    # values copied into post_tags' (tag_id, post_created_at, post_id) index
+    created_at, post_id = Post.created_at, Post.id
+    if tag:
+        query = query.join(post_tags, post_tags.c.post_id == Post.id).where(
+            post_tags.c.tag_id == select(Tag.id).where(Tag.name == tag).scalar_subquery()
+        )
+        created_at, post_id = post_tags.c.post_created_at, post_tags.c.post_id
+    if featured is not None:
+        query = query.where(Post.featured == featured)
+    if after:
+        query = query.where(tuple_(created_at, post_id) < tuple_(*after))
+    # One extra row tells whether another page exists
+    return query.order_by(created_at.desc(), post_id.desc()).limit(limit + 1)
+
+def _stamp(value: Optional[datetime]) -> str:
+    return value.strftime("%Y%m%d%H%M%S%f") if value else "0"
+
+# SQLite answers `slug = ?` through the unique ix_posts_slug without
+# costing alternatives, then reads the row (and its bodies) for
+# updated_at; INDEXED BY keeps the check on the covering index.
+_post_version = text(
+    "SELECT id, updated_at FROM posts INDEXED BY ix_posts_slug_updated_at WHERE slug = :slug"
+).columns(Post.id, Post.updated_at)
+
+async def post_version(db: AsyncSession, slug: str) -> Optional[tuple[str, Optional[datetime]]]:
+    """(ETag, Last-Modified) of a post from its id and updated_at; None if it doesn't exist."""
+    row = (await db.execute(_post_version, {"slug": slug})).first()
+    if row is None:
+        return None
+    post_id, updated_at = row
+    return f'"{post_id}-{_stamp(updated_at)}"', updated_at
+
+async def page_version(
+    db: AsyncSession,
+    featured: Optional[bool] = None,
+    tag: Optional[str] = None,
+    after: Optional[tuple[datetime, int]] = None,
+    limit: int = 20,
+) -> tuple[str, Optional[datetime]]:
+    """(ETag, Last-Modified) of the page list_post_page would return.
+
+    Reads only (id, updated_at) of the page's rows, from the keyset index: a
+    post edited, added to or removed from the page changes the ETag.
+    """
+    rows = (await db.execute(_page_query((Post.id, Post.updated_at), featured, tag, after, limit))).all()
+    digest = hashlib.blake2b(digest_size=12)
+    for post_id, updated_at in rows:
+        digest.update(f"{post_id}-{_stamp(updated_at)};".encode())
+    return f'"{digest.hexdigest()}"', max((row[1] for row in rows if row[1]), default=None)
+
+async def list_post_page(
+    db: AsyncSession,
+    featured: Optional[bool] = None,
+    tag: Optional[str] = None,
+    after: Optional[tuple[datetime, int]] = None,
+    limit: int = 20,
+) -> tuple[bytes, Optional[str]]:
+    """One keyset page of posts as a JSON array, plus the cursor for the next page."""
+    query = _page_query(_columns, featured, tag, after, limit).join(User, User.id == Post.author_id)
+    rows = (await db.execute(query)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][6], rows[-1][0])
+    return _encode([_row_dict(row) for row in rows]).encode("utf-8"), next_cursor
+
+async def list_related_page(db: AsyncSession, post_id: int, limit: int) -> bytes:
+    """The post's precomputed neighbours (app.related), best first, as a JSON array."""
+    query = (
+        select(*_columns)
+        .join(User, User.id == Post.author_id)
+        .join(post_related, post_related.c.related_id == Post.id)
+        .where(post_related.c.post_id == post_id)
+        .order_by(post_related.c.score.desc(), post_related.c.related_id.desc())
+        .limit(limit)
+    )
+    rows = (await db.execute(query)).all()
+    return _encode([_row_dict(row) for row in rows]).encode("utf-8")
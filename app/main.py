@@ -1,22 +1,29 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from app import metrics
+from app.assets import AssetFiles, Shell, load_manifest
 from app.config import get_settings
-from app.database import init_db
-from app.routers import auth, posts
+from app.bootstrap import on_worker_startup
+from app.database import engine, read_engine, write_engine
+from app.jobs import job_worker
+from app.routers import auth, posts, tags
+from app.writer import write_queue
 
 settings = get_settings()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_db()
-    # Seed demo data
-    from app.seed import seed_database
-    await seed_database()
+    # Schema + demo data: once per deployment, not once per worker (see app.bootstrap)
+    await on_worker_startup()
+    # Drain jobs left over from the last run
+    job_worker.wake()
     yield
+    # Let queued writes commit before the worker exits
+    await job_worker.close()
+    await write_queue.close()
 
 app = FastAPI(
     title=settings.app_name,
@@ -32,21 +39,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Post-Version"],
 )
 
+# Metrics (outermost, so the latency includes every other middleware)
+for instrumented in {engine, write_engine, read_engine}:
+    metrics.instrument_engine(instrumented)
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Static files & Templates
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# (hashed assets from `python -m app.assets` get immutable caching + gzip/br)
+app.mount("/static", AssetFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
+# The shell never changes while the process runs: render it once
+shell = Shell.render(templates, load_manifest())
 
 # API Routes
 app.include_router(auth.router)
 app.include_router(posts.router)
+app.include_router(tags.router)
 
 # Health check
 @app.get("/api/health")
 async def health():
     return {"status": "ok", "app": settings.app_name}
 
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Frontend routes (SPA fallback)
 @app.get("/", response_class=HTMLResponse)
 @app.get("/{path:path}", response_class=HTMLResponse)
@@ -54,4 +75,4 @@ async def serve_spa(request: Request, path: str = ""):
     # API routes handled above
     if path.startswith("api/") or path.startswith("static/"):
         return None
-    return templates.TemplateResponse("index.html", {"request": request})
+    return shell.response(request.headers.get("if-none-match"))
@@ -0,0 +1,276 @@
+"""Request and SQL instrumentation exposed in Prometheus text format.
+
+MetricsMiddleware times every request and records, per route template, the
+latency, response size and how many SQL statements it ran (and for how
+long); the statement counts come from engine events attributed to the
+request through a context variable.
+
+Every worker keeps its numbers in memory and writes a snapshot to
+<data_dir>/metrics/<pid>.json at most once per FLUSH_INTERVAL; a request
+that lands inside the window schedules a flush for its end, so an idle
+worker's file is never behind. The in-flight gauge goes unthrottled into
+<pid>.gauge (one pwrite per change). /api/metrics sums the files of all
+live workers, so a scrape reports the whole gunicorn fleet whichever
+worker answers it. Snapshots of dead workers are discarded; Prometheus
+treats the resulting drop as a counter reset.
+"""
+import asyncio
+import json
+import logging
+import os
+import struct
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+FLUSH_INTERVAL = 1.0
+
+# name: (type, help, label names, buckets)
+METRICS = {
+    "blog_http_requests_total": ("counter", "HTTP requests handled.", ("route", "method", "status"), None),
+    "blog_http_request_duration_seconds": ("histogram", "Request latency.", ("route", "method"), LATENCY_BUCKETS),
+    "blog_http_response_size_bytes": ("histogram", "Response body size.", ("route", "method"), SIZE_BUCKETS),
+    "blog_db_statements_per_request": ("histogram", "SQL statements executed per request.", ("route", "method"), STATEMENT_BUCKETS),
+    "blog_db_statement_duration_seconds_total": ("counter", "Time spent executing SQL.", ("route", "method"), None),
+    "blog_http_requests_in_flight": ("gauge", "Requests currently being handled.", (), None),
+}
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    sql_seconds: float = 0.0
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+class Registry:
+    """In-process metric values: counters/gauges hold a float, histograms
+    a list of per-bucket counts followed by sum and count."""
+
+    def __init__(self):
+        self.values: dict[str, dict[tuple, object]] = {name: {} for name in METRICS}
+
+    def inc(self, name: str, labels: tuple, amount: float = 1.0) -> None:
+        series = self.values[name]
+        series[labels] = series.get(labels, 0.0) + amount
+
+    def observe(self, name: str, labels: tuple, value: float) -> None:
+        buckets = METRICS[name][3]
+        series = self.values[name]
+        entry = series.get(labels)
+        if entry is None:
+            entry = series[labels] = [0] * (len(buckets) + 1) + [0.0, 0]
+        entry[bisect_left(buckets, value)] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+    def snapshot(self) -> dict:
+        return {name: [[list(labels), value] for labels, value in series.items()]
+                for name, series in self.values.items()}
+
+    def merge(self, snapshot: dict) -> None:
+        for name, series in snapshot.items():
+            if name not in self.values:
+                continue
+            for labels, value in series:
+                labels = tuple(labels)
+                current = self.values[name].get(labels)
+                if current is None:
+                    self.values[name][labels] = value
+                elif isinstance(current, list):
+                    self.values[name][labels] = [a + b for a, b in zip(current, value)]
+                else:
+                    self.values[name][labels] = current + value
+
+registry = Registry()
+_in_flight = 0
+_last_flush = 0.0
+_deferred_on: Optional[asyncio.AbstractEventLoop] = None
+_gauge: Optional[tuple[int, int]] = None  # (pid, fd)
+
+# ============ SQL ============
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Attribute every statement run on the engine to the current request."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.sql_seconds += elapsed
+
+# ============ Requests ============
+def _route_name(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mounts (static files) leave their prefix in root_path
+    return scope.get("root_path") or "<unmatched>"
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.settings = get_settings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        _set_in_flight(1)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _set_in_flight(-1)
+            _current.reset(token)
+            route, method = _route_name(scope), scope["method"]
+            labels = (route, method)
+            registry.inc("blog_http_requests_total", (route, method, str(status)))
+            registry.observe("blog_http_request_duration_seconds", labels, elapsed)
+            registry.observe("blog_http_response_size_bytes", labels, size)
+            registry.observe("blog_db_statements_per_request", labels, stats.statements)
+            registry.inc("blog_db_statement_duration_seconds_total", labels, stats.sql_seconds)
+            threshold = self.settings.metrics_query_warning_threshold
+            if threshold and stats.statements > threshold:
+                logger.warning(
+                    "%s %s ran %d SQL statements (%.1f ms); possible N+1 query",
+                    method, scope["path"], stats.statements, stats.sql_seconds * 1000,
+                )
+            flush()
+
+# ============ Aggregation ============
+def _metrics_dir() -> str:
+    return os.path.join(get_settings().data_dir, "metrics")
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _set_in_flight(delta: int) -> None:
+    global _in_flight, _gauge
+    _in_flight += delta
+    pid = os.getpid()
+    if _gauge is None or _gauge[0] != pid:
+        # Opened once per process (gunicorn forks after import)
+        directory = _metrics_dir()
+        os.makedirs(directory, exist_ok=True)
+        _gauge = (pid, os.open(os.path.join(directory, f"{pid}.gauge"), os.O_RDWR | os.O_CREAT, 0o644))
+    os.pwrite(_gauge[1], struct.pack("<q", _in_flight), 0)
+
+def _deferred_flush() -> None:
+    global _deferred_on
+    _deferred_on = None
+    flush()
+
+def flush(force: bool = False) -> None:
+    """Write this worker's snapshot, at most once per FLUSH_INTERVAL.
+
+    A throttled call schedules a flush for the end of the window instead.
+    """
+    global _last_flush, _deferred_on
+    now = time.monotonic()
+    if not force and now - _last_flush < FLUSH_INTERVAL:
+        loop = asyncio.get_running_loop()
+        if _deferred_on is not loop:
+            _deferred_on = loop
+            loop.call_later(_last_flush + FLUSH_INTERVAL - now, _deferred_flush)
+        return
+    _last_flush = now
+    directory = _metrics_dir()
+    os.makedirs(directory, exist_ok=True)
+    snapshot = registry.snapshot()
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(snapshot, f)
+    os.replace(path + ".tmp", path)
+
+def collect() -> Registry:
+    """Sum the snapshots of every live worker, this one included."""
+    flush(force=True)
+    total = Registry()
+    in_flight = 0
+    directory = _metrics_dir()
+    for filename in os.listdir(directory):
+        pid, _, kind = filename.partition(".")
+        if kind not in ("json", "gauge"):
+            continue
+        path = os.path.join(directory, filename)
+        if not _pid_alive(int(pid)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            continue
+        try:
+            if kind == "gauge":
+                with open(path, "rb") as f:
+                    in_flight += struct.unpack("<q", f.read(8))[0]
+            else:
+                with open(path) as f:
+                    total.merge(json.load(f))
+        except (FileNotFoundError, ValueError, struct.error):
+            continue
+    total.values["blog_http_requests_in_flight"][()] = float(in_flight)
+    return total
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    values = collect().values
+    lines = []
+    for name, (kind, help_text, label_names, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(values[name].items()):
+            if kind != "histogram":
+                lines.append(f"{name}{_format_labels(label_names, labels)} {_format_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), value):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{name}_bucket{_format_labels(label_names, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(label_names, labels)} {_format_number(value[-2])}")
+            lines.append(f"{name}_count{_format_labels(label_names, labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
@@ -1,19 +1,71 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import JSON, Column, Integer, Float, String, Text, Boolean, DateTime, ForeignKey, LargeBinary, Table, Index, DDL, event
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
+from app.compression import CompressedText
 from app.database import Base
 
 # Many-to-many: posts <-> tags
 post_tags = Table(
     "post_tags", Base.metadata,
     Column("post_id", Integer, ForeignKey("posts.id", ondelete="CASCADE")),
-    Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE"))
+    Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE")),
+    # Copy of posts.created_at kept by the triggers below, so a tag's posts
+    # can be paged newest first straight from the index
+    Column("post_created_at", DateTime, nullable=True),
+    # The primary key (a unique index is all a composite SQLite key is, and
+    # it can be added to existing databases); covers the per-post tag
+    # lookups of selectinload and app.listing
+    Index("ix_post_tags_post_id_tag_id", "post_id", "tag_id", unique=True),
+    # Inverted index: a tag's posts newest first, for ?tag= listings and
+    # app.related's candidates
+    Index("ix_post_tags_tag_id_post_created_at", "tag_id", "post_created_at", "post_id"),
+)
+
+# Preset dictionaries for compressed post bodies (app.compression); append-only
+content_dictionaries = Table(
+    "content_dictionaries", Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("data", LargeBinary, nullable=False),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+# Outbox of work derived from writes (app.jobs), enqueued in the write's transaction
+jobs = Table(
+    "jobs", Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("key", String(255), nullable=False),  # idempotency key, e.g. search:<post id>
+    Column("kind", String(50), nullable=False),
+    Column("payload", JSON, nullable=False),
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("run_at", DateTime, nullable=False, default=datetime.utcnow),
+    Column("last_error", Text, nullable=True),
+    Index("ix_jobs_key", "key", unique=True),
+    # Due jobs in order
+    Index("ix_jobs_run_at_id", "run_at", "id"),
+)
+
+# Archive-wide counters kept by the triggers below (e.g. "posts": the post count)
+counters = Table(
+    "counters", Base.metadata,
+    Column("name", String(50), primary_key=True),
+    Column("value", Integer, nullable=False, default=0),
+)
+
+# Each post's top related posts, maintained by app.related
+post_related = Table(
+    "post_related", Base.metadata,
+    Column("post_id", Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True),
+    Column("related_id", Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True),
+    Column("score", Float, nullable=False),
+    # One range scan per lookup, already in display order
+    Index("ix_post_related_post_id_score", "post_id", "score", "related_id"),
+    Index("ix_post_related_related_id", "related_id"),
 )
 
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
     name = Column(String(100), nullable=False)
     hashed_password = Column(String(255), nullable=False)
@@ -26,24 +78,104 @@ class User(Base):
 class Post(Base):
     __tablename__ = "posts"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     slug = Column(String(255), unique=True, index=True, nullable=False)
     title = Column(String(255), nullable=False)
     excerpt = Column(Text, nullable=True)
-    content = Column(Text, nullable=False)
+    # Written by the author; otherwise excerpt is derived and follows content edits
+    excerpt_custom = Column(Boolean, nullable=False, default=False, server_default="0")
+    # Bodies: stored per CONTENT_COMPRESSION and loaded only on request
+    # (options(undefer(...))); listings never read them
+    content = deferred(Column(CompressedText, nullable=False), raiseload=True)
+    content_html = deferred(Column(CompressedText, nullable=True), raiseload=True)  # rendered at write time by app.content
+    word_count = Column(Integer, nullable=True)
     featured = Column(Boolean, default=False)
     read_time = Column(String(20), default="5 dk")
+    # Bumped by every update; PATCH edits name the version they were made against
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    author_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    author_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     author = relationship("User", back_populates="posts")
     tags = relationship("Tag", secondary=post_tags, back_populates="posts")
+    
+    __table_args__ = (
+        # Keyset pagination order for list_posts. updated_at rides along so
+        # app.listing.page_version reads a page's validator from the index alone
+        Index("ix_posts_created_at_id_updated_at", "created_at", "id", "updated_at"),
+        Index("ix_posts_featured_created_at_id_updated_at", "featured", "created_at", "id", "updated_at"),
+        # app.listing.post_version's validator, read from the index alone
+        Index("ix_posts_slug_updated_at", "slug", "updated_at"),
+    )
 
 class Tag(Base):
     __tablename__ = "tags"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String(50), unique=True, index=True, nullable=False)
+    # Maintained by the triggers below; repair with `python -m app.tags`
+    post_count = Column(Integer, nullable=False, default=0, server_default="0")
+    featured_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     posts = relationship("Post", secondary=post_tags, back_populates="tags")
+    
+    __table_args__ = (
+        # GET /api/tags order, read straight from the index
+        Index("ix_tags_post_count_name", post_count.desc(), "name"),
+        Index("ix_tags_featured_count_name", featured_count.desc(), "name"),
+    )
+
+# Full-text index over case/diacritic-folded post text (rowid = posts.id).
+# Kept in sync by app.search; rebuild with `python -m app.search`.
+event.listen(
+    Base.metadata, "after_create",
+    DDL(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5("
+        "title, excerpt, content, tags, tokenize='unicode61 remove_diacritics 2')"
+    ).execute_if(dialect="sqlite")
+)
+
+# Tag facet counters, kept in the same transaction as every post_tags and
+# posts.featured change however it is written (ORM, bulk import, seed).
+TAG_COUNT_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS post_tags_count_insert AFTER INSERT ON post_tags BEGIN
+        UPDATE tags SET post_count = post_count + 1,
+            featured_count = featured_count + COALESCE((SELECT featured FROM posts WHERE id = NEW.post_id), 0)
+        WHERE id = NEW.tag_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS post_tags_count_delete AFTER DELETE ON post_tags BEGIN
+        UPDATE tags SET post_count = post_count - 1,
+            featured_count = featured_count - COALESCE((SELECT featured FROM posts WHERE id = OLD.post_id), 0)
+        WHERE id = OLD.tag_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_featured_count_update AFTER UPDATE OF featured ON posts
+    WHEN OLD.featured IS NOT NEW.featured BEGIN
+        UPDATE tags SET featured_count = featured_count + (CASE WHEN NEW.featured THEN 1 ELSE -1 END)
+        WHERE id IN (SELECT tag_id FROM post_tags WHERE post_id = NEW.id);
+    END""",
+]
+
+# post_tags.post_created_at mirrors posts.created_at
+POST_CREATED_AT_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS post_tags_created_at_insert AFTER INSERT ON post_tags
+    WHEN NEW.post_created_at IS NULL BEGIN
+        UPDATE post_tags SET post_created_at = (SELECT created_at FROM posts WHERE id = NEW.post_id)
+        WHERE rowid = NEW.rowid;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_created_at_update AFTER UPDATE OF created_at ON posts
+    WHEN OLD.created_at IS NOT NEW.created_at BEGIN
+        UPDATE post_tags SET post_created_at = NEW.created_at WHERE post_id = NEW.id;
+    END""",
+]
+# counters["posts"], so app.related weighs tags without counting the archive
+POST_COUNT_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS posts_count_insert AFTER INSERT ON posts BEGIN
+        UPDATE counters SET value = value + 1 WHERE name = 'posts';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_count_delete AFTER DELETE ON posts BEGIN
+        UPDATE counters SET value = value - 1 WHERE name = 'posts';
+    END""",
+]
+for trigger in TAG_COUNT_TRIGGERS + POST_CREATED_AT_TRIGGERS + POST_COUNT_TRIGGERS:
+    event.listen(Base.metadata, "after_create", DDL(trigger).execute_if(dialect="sqlite"))
@@ -0,0 +1,128 @@
+"""Token buckets shared by every worker, for the login and signup endpoints.
+
+Buckets live in a memory-mapped file next to the database (like the cache
+invalidation signal in app.cache), so a client cannot multiply its budget by
+landing on different gunicorn workers. Each bucket is a slot holding a key
+fingerprint, the remaining tokens and the time of the last update; keys map
+to one of two neighbouring slots by hash, and a slot whose bucket has
+refilled completely may be reused by another key.
+
+Handlers call check_auth_rate() before any bcrypt work, so a rejected
+attempt costs a hash lookup and a file lock, not a password hash.
+"""
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+from fastapi import HTTPException, Request, status
+from app.config import get_settings
+
+_BUCKET = struct.Struct("<Qdd")  # key fingerprint, tokens, updated (unix time)
+
+@dataclass(frozen=True)
+class Rate:
+    burst: float
+    per_second: float
+
+class TokenBuckets:
+    def __init__(self, path: str, slots: int = 65536):
+        self.path = path
+        self.slots = slots
+        self._map: Optional[mmap.mmap] = None
+        self._fd: Optional[int] = None
+
+    def _open(self) -> mmap.mmap:
+        if self._map is None:
+            size = self.slots * _BUCKET.size
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._fd = fd
+            self._map = mmap.mmap(fd, size)
+        return self._map
+
+    @staticmethod
+    def _fingerprint(key: str) -> int:
+        # Never 0: a zeroed slot is empty
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+
+    def _locate(self, mm: mmap.mmap, fingerprint: int, rate: Rate, now: float) -> tuple[int, float]:
+        """Offset of the key's slot and its current (refilled) token count."""
+        first = fingerprint % self.slots
+        slots = []
+        for slot in (first, (first + 1) % self.slots):
+            offset = slot * _BUCKET.size
+            owner, tokens, updated = _BUCKET.unpack_from(mm, offset)
+            refilled = min(rate.burst, tokens + max(0.0, now - updated) * rate.per_second)
+            if owner == fingerprint:
+                return offset, refilled
+            slots.append((owner, offset, refilled))
+        for owner, offset, refilled in slots:
+            # New key: take a free slot or one whose bucket has fully refilled
+            if owner == 0 or refilled >= rate.burst:
+                return offset, rate.burst
+        # Both neighbours busy: share the first bucket (errs on the side of limiting)
+        _, offset, refilled = slots[0]
+        return offset, refilled
+
+    def take(self, keys: list[tuple[str, Rate]]) -> float:
+        """Take one token from every bucket, or none if any is empty.
+
+        Returns 0 on success, otherwise the seconds until all could be taken.
+        """
+        mm = self._open()
+        now = time.time()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            located = []
+            wait = 0.0
+            for key, rate in keys:
+                fingerprint = self._fingerprint(key)
+                offset, tokens = self._locate(mm, fingerprint, rate, now)
+                located.append((offset, fingerprint, tokens))
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / rate.per_second)
+            if wait:
+                return wait
+            for offset, fingerprint, tokens in located:
+                _BUCKET.pack_into(mm, offset, fingerprint, tokens - 1, now)
+            return 0.0
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+@lru_cache()
+def get_buckets() -> TokenBuckets:
+    return TokenBuckets(os.path.join(get_settings().data_dir, "ratelimit.buckets"))
+
+def client_ip(request: Request) -> str:
+    # Behind a proxy, uvicorn rewrites this from X-Forwarded-For for trusted
+    # proxies (FORWARDED_ALLOW_IPS); the header itself is never trusted here
+    return request.client.host if request.client else "unknown"
+
+def check_auth_rate(request: Request, email: str) -> None:
+    """Raise 429 with Retry-After when the client IP or the account is over its rate."""
+    settings = get_settings()
+    if not settings.rate_limit_enabled:
+        return
+    wait = get_buckets().take([
+        (f"auth:ip:{client_ip(request)}",
+         Rate(settings.rate_limit_ip_burst, settings.rate_limit_ip_per_minute / 60)),
+        (f"auth:email:{email.strip().lower()}",
+         Rate(settings.rate_limit_email_burst, settings.rate_limit_email_per_minute / 60)),
+    ])
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Çok fazla deneme, lütfen daha sonra tekrar deneyin",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
@@ -0,0 +1,159 @@
+"""Precomputed related posts: the top RELATED_POSTS_K neighbours of every post.
+
+    python -m app.related   # rebuild post_related from scratch
+
+Two posts are related through the tags they share. Each shared tag adds
+ln(1 + posts / posts with the tag), so a niche tag counts for more than one
+every post carries, and the sum is divided by 1 + days_apart / half-life
+so posts written around the same time rank first. The score depends only
+on the pair, never on the current time, so it does not go stale and is
+symmetric: when a post's tags change, only posts sharing a tag with it can
+gain it as a neighbour and only posts that listed it can lose it. Candidates
+come from post_tags' inverted (tag_id, ...) index.
+
+post_related holds each post's top K rows and is read with one index range
+scan. The tag weights are taken when a row is written; a rebuild refreshes
+them after the archive's tag mix has shifted a lot.
+"""
+import math
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import case, delete, func, insert, literal, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+from app.models import Post, Tag, counters, post_related, post_tags
+
+settings = get_settings()
+
+async def _profile(db: AsyncSession, post_id: int, total: int) -> Optional[tuple[datetime, dict[int, float]]]:
+    """The post's created_at and {tag_id: weight} in an archive of total posts; None if it is gone or untagged."""
+    created_at = await db.scalar(select(Post.created_at).where(Post.id == post_id))
+    if created_at is None:
+        return None
+    result = await db.execute(
+        select(Tag.id, Tag.post_count)
+        .join(post_tags, post_tags.c.tag_id == Tag.id)
+        .where(post_tags.c.post_id == post_id)
+    )
+    weights = {tag_id: math.log(1 + total / max(count, 1)) for tag_id, count in result}
+    return (created_at, weights) if weights else None
+
+async def _archive_size(db: AsyncSession) -> int:
+    """The post count, kept by a trigger (app.models.POST_COUNT_TRIGGERS)."""
+    return await db.scalar(select(counters.c.value).where(counters.c.name == "posts")) or 0
+
+def _candidates(post_id: int, created_at: datetime, weights: dict[int, float]):
+    """(post_id, score) of every post sharing a tag with post_id."""
+    shared = (
+        select(post_tags.c.post_id, post_tags.c.tag_id)
+        .where(post_tags.c.tag_id.in_(weights), post_tags.c.post_id != post_id)
+        .subquery()
+    )
+    days_apart = func.abs(func.julianday(Post.created_at) - func.julianday(created_at))
+    score = func.sum(case(weights, value=shared.c.tag_id)) / (1 + days_apart / settings.related_half_life_days)
+    return (
+        select(shared.c.post_id, score.label("score"))
+        .join(Post, Post.id == shared.c.post_id)
+        .group_by(shared.c.post_id)
+        .subquery()
+    )
+
+def _top(candidates, k: int):
+    return candidates.select().order_by(candidates.c.score.desc(), candidates.c.post_id.desc()).limit(k)
+
+async def _refresh(db: AsyncSession, post_id: int, total: int) -> None:
+    """Recompute one post's neighbours from scratch."""
+    await db.execute(delete(post_related).where(post_related.c.post_id == post_id))
+    profile = await _profile(db, post_id, total)
+    if profile is None:
+        return
+    top = _top(_candidates(post_id, *profile), settings.related_posts_k).subquery()
+    await db.execute(insert(post_related).from_select(
+        ["post_id", "related_id", "score"], select(literal(post_id), top.c.post_id, top.c.score)
+    ))
+
+async def update_related(db: AsyncSession, post_id: int) -> None:
+    """Bring post_related up to date after a post was created, retagged or deleted.
+
+    Call after the change is flushed. Work is proportional to the posts
+    sharing a tag with it, never to the archive.
+    """
+    k = settings.related_posts_k
+    # Read once: every _profile below weighs tags against the same archive size
+    total = await _archive_size(db)
+    result = await db.execute(select(post_related.c.post_id).where(post_related.c.related_id == post_id))
+    listed_by = set(result.scalars())
+    await db.execute(delete(post_related).where(
+        or_(post_related.c.post_id == post_id, post_related.c.related_id == post_id)
+    ))
+
+    profile = await _profile(db, post_id, total)
+    if profile is not None:
+        candidates = _candidates(post_id, *profile)
+        top = _top(candidates, k).subquery()
+        await db.execute(insert(post_related).from_select(
+            ["post_id", "related_id", "score"], select(literal(post_id), top.c.post_id, top.c.score)
+        ))
+        # Offer the post to every candidate whose list has room or a weaker tail...
+        theirs = post_related.alias("theirs")
+        size = select(func.count()).where(theirs.c.post_id == candidates.c.post_id).scalar_subquery()
+        weakest = select(func.min(theirs.c.score)).where(theirs.c.post_id == candidates.c.post_id).scalar_subquery()
+        await db.execute(insert(post_related).from_select(
+            ["post_id", "related_id", "score"],
+            select(candidates.c.post_id, literal(post_id), candidates.c.score)
+            .where(or_(size < k, candidates.c.score > weakest)),
+        ))
+        # ...then cut those lists back to k
+        ranked = (
+            select(
+                post_related.c.post_id, post_related.c.related_id,
+                func.row_number().over(
+                    partition_by=post_related.c.post_id,
+                    order_by=(post_related.c.score.desc(), post_related.c.related_id.desc()),
+                ).label("rank"),
+            )
+            .where(post_related.c.post_id.in_(
+                select(theirs.c.post_id).where(theirs.c.related_id == post_id)
+            ))
+            .subquery()
+        )
+        await db.execute(delete(post_related).where(
+            tuple_(post_related.c.post_id, post_related.c.related_id).in_(
+                select(ranked.c.post_id, ranked.c.related_id).where(ranked.c.rank > k)
+            )
+        ))
+
+    # Posts that listed this one lost a neighbour (or its score changed)
+    for other in listed_by - {post_id}:
+        await _refresh(db, other, total)
+
+async def build_related(db: AsyncSession, batch_size: int = 1000) -> int:
+    """Recompute every post's neighbours, committing per batch. Returns the post count."""
+    await db.execute(delete(post_related))
+    total = await _archive_size(db)
+    count = 0
+    last_id = 0
+    while True:
+        ids = list((await db.execute(
+            select(Post.id).where(Post.id > last_id).order_by(Post.id).limit(batch_size)
+        )).scalars())
+        if not ids:
+            break
+        for post_id in ids:
+            await _refresh(db, post_id, total)
+        await db.commit()
+        count += len(ids)
+        last_id = ids[-1]
+    await db.commit()
+    return count
+
+async def _main() -> None:
+    from app.database import async_session, init_db
+    await init_db()
+    async with async_session() as db:
+        count = await build_related(db)
+    print(f"Computed related posts for {count} posts.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(_main())
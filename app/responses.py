@@ -0,0 +1,80 @@
+"""JSON responses serialized straight from pydantic models.
+
+A handler that returns a model lets FastAPI validate it again against
+response_model, turn it into plain dicts with field.serialize() and then
+json.dumps() the result. The models built in the handlers are already
+valid, so these helpers skip both steps and emit pydantic-core's own JSON
+bytes; response_model stays on the route for the OpenAPI schema.
+
+The bytes are identical to what FastAPI would send: compact separators and
+ensure_ascii=False on both paths.
+
+Conditional GET: handlers build validator_headers() from a cheap version
+query and answer not_modified() when is_not_modified() says the client's
+copy is current, before loading or serializing anything.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import lru_cache
+from typing import Any, Optional, Sequence
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+
+class ModelResponse(Response):
+    media_type = "application/json"
+
+@lru_cache()
+def _list_adapter(model: type) -> TypeAdapter:
+    return TypeAdapter(list[model])
+
+def json_bytes(content: Any) -> bytes:
+    """A model or a list of models as JSON bytes; lists use a cached TypeAdapter."""
+    if isinstance(content, BaseModel):
+        return content.__pydantic_serializer__.to_json(content)
+    if not content:
+        return b"[]"
+    return _list_adapter(type(content[0])).dump_json(content)
+
+def model_response(
+    content: BaseModel | Sequence[BaseModel],
+    status_code: int = 200,
+    headers: Optional[dict] = None,
+) -> ModelResponse:
+    return ModelResponse(json_bytes(content), status_code=status_code, headers=headers)
+
+def json_payload(body: bytes, headers: Optional[dict] = None) -> ModelResponse:
+    """Already-serialized JSON bytes (e.g. from a cache)."""
+    return ModelResponse(body, headers=headers)
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict[str, str]:
+    """ETag / Last-Modified (naive UTC) headers for a conditional GET response."""
+    # no-cache: revalidate every time, rather than letting browsers guess a
+    # freshness lifetime from Last-Modified
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+def is_not_modified(request: Request, headers: dict[str, str], modified_since: bool = True) -> bool:
+    """Whether the request's If-None-Match (or, without one, If-Modified-Since) matches.
+
+    Pass modified_since=False where Last-Modified cannot see every change
+    (e.g. a list a post was removed from).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or headers["ETag"] in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if not modified_since or not if_modified_since or "Last-Modified" not in headers:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return parsedate_to_datetime(headers["Last-Modified"]) <= since
+
+def not_modified(headers: dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from pydantic import BaseModel
 from app.database import get_db
 from app.models import User
 from app.schemas import UserCreate, UserLogin, Token, UserResponse
-from app.auth import hash_password, verify_password, create_access_token, require_auth
+from app.writer import write_queue
+from app.ratelimit import check_auth_rate
+from app.responses import model_response
+from app.auth import UserSnapshot, hash_password, verify_password, needs_rehash, create_access_token, require_auth
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -15,58 +18,79 @@ class OAuthDemoRequest(BaseModel):
     name: str
 
 @router.post("/register", response_model=Token)
-async def register(data: UserCreate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.email == data.email))
+async def register(data: UserCreate, request: Request, db: AsyncSession = Depends(get_db)):
+    check_auth_rate(request, data.email)
+    # Cheap early answer before paying for bcrypt; re-checked inside the write
+    result = await db.execute(select(User.id).where(User.email == data.email))
     if result.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Bu email zaten kayıtlı")
+    hashed_password = await hash_password(data.password)
     
-    user = User(
-        email=data.email,
-        name=data.name,
-        hashed_password=hash_password(data.password),
-        provider="email"
-    )
-    db.add(user)
-    await db.commit()
-    await db.refresh(user)
-    
-    token = create_access_token({"sub": user.id})
-    return Token(access_token=token, user=UserResponse.model_validate(user))
-
-@router.post("/oauth-demo", response_model=Token)
-async def oauth_demo_login(data: OAuthDemoRequest, db: AsyncSession = Depends(get_db)):
-    """Demo OAuth login - creates or finds user and returns real JWT token."""
-    # Check if user exists
-    result = await db.execute(select(User).where(User.email == data.email))
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        # Create new OAuth demo user (no password needed)
+    async def write(db: AsyncSession) -> UserResponse:
+        result = await db.execute(select(User.id).where(User.email == data.email))
+        if result.scalar_one_or_none():
+            raise HTTPException(status_code=400, detail="Bu email zaten kayıtlı")
         user = User(
             email=data.email,
             name=data.name,
-            hashed_password="",  # OAuth users don't have passwords
-            provider=data.provider
+            hashed_password=hashed_password,
+            provider="email"
         )
         db.add(user)
-        await db.commit()
-        await db.refresh(user)
+        await db.flush()
+        return UserResponse.model_validate(user)
+    
+    user = await write_queue.submit(write)
+    token = create_access_token({"sub": user.id})
+    return model_response(Token(access_token=token, user=user))
+
+@router.post("/oauth-demo", response_model=Token)
+async def oauth_demo_login(data: OAuthDemoRequest, request: Request):
+    """Demo OAuth login - creates or finds user and returns real JWT token."""
+    check_auth_rate(request, data.email)
+    async def write(db: AsyncSession) -> UserResponse:
+        # Check if user exists
+        result = await db.execute(select(User).where(User.email == data.email))
+        user = result.scalar_one_or_none()
+        
+        if not user:
+            # Create new OAuth demo user (no password needed)
+            user = User(
+                email=data.email,
+                name=data.name,
+                hashed_password="",  # OAuth users don't have passwords
+                provider=data.provider
+            )
+            db.add(user)
+            await db.flush()
+        return UserResponse.model_validate(user)
     
     # Generate real JWT token
+    user = await write_queue.submit(write)
     token = create_access_token({"sub": user.id})
-    return Token(access_token=token, user=UserResponse.model_validate(user))
+    return model_response(Token(access_token=token, user=user))
 
 @router.post("/login", response_model=Token)
-async def login(data: UserLogin, db: AsyncSession = Depends(get_db)):
+async def login(data: UserLogin, request: Request, db: AsyncSession = Depends(get_db)):
+    check_auth_rate(request, data.email)
     result = await db.execute(select(User).where(User.email == data.email))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(data.password, user.hashed_password):
+    if not user or not await verify_password(data.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Email veya şifre hatalı")
     
+    # Upgrade the stored hash when the configured work factor changed
+    if needs_rehash(user.hashed_password):
+        hashed_password = await hash_password(data.password)
+        
+        async def write(db: AsyncSession) -> None:
+            await db.execute(update(User).where(User.id == user.id).values(hashed_password=hashed_password))
+        
+        await write_queue.submit(write)
+    
     token = create_access_token({"sub": user.id})
-    return Token(access_token=token, user=UserResponse.model_validate(user))
+    return model_response(Token(access_token=token, user=UserResponse.model_validate(user)))
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(user: User = Depends(require_auth)):
-    return UserResponse.model_validate(user)
+async def get_me(user: UserSnapshot = Depends(require_auth)):
+    return model_response(UserResponse.model_validate(user))
@@ -1,138 +1,356 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, undefer
 from typing import Optional
-from app.database import get_db
-from app.models import User, Post, Tag
-from app.schemas import PostCreate, PostUpdate, PostResponse, PostListResponse
-from app.auth import get_current_user, require_auth
-from app.utils import slugify, calculate_read_time, generate_excerpt
+from datetime import datetime
+from app.cache import ResponseCache, get_signal
+from app.config import get_settings
+from app.database import async_session, get_read_db, read_session
+from app.models import Post
+from app.schemas import PostCreate, PostUpdate, PostPatch, PostPatchResponse, PostResponse, PostListResponse, PostSearchResponse, UserResponse
+from app.auth import UserSnapshot, get_current_user, require_auth
+from app.search import search_posts, make_snippet
+from app.tags import resolve_tags
+from app.jobs import enqueue
+from app.listing import list_post_page, list_related_page, page_version, post_version
+from app.utils import apply_edits, slugify, decode_cursor
+from app.content import render_content
+from app.transfer import RecordError, export_posts, import_posts, iter_lines
+from app.writer import write_queue
+from app.responses import is_not_modified, json_bytes, json_payload, model_response, not_modified, validator_headers
 
 router = APIRouter(prefix="/api/posts", tags=["posts"])
 
-async def get_or_create_tags(db: AsyncSession, tag_names: list[str]) -> list[Tag]:
-    tags = []
-    for name in tag_names:
-        result = await db.execute(select(Tag).where(Tag.name == name))
-        tag = result.scalar_one_or_none()
-        if not tag:
-            tag = Tag(name=name)
-            db.add(tag)
-        tags.append(tag)
-    return tags
+settings = get_settings()
+post_cache = ResponseCache(
+    get_signal(),
+    max_entries=settings.cache_max_entries,
+    ttl=settings.cache_ttl_seconds,
+)
+
+LIST_TAG = "posts:list"
+
+def post_tag(slug: str) -> str:
+    return f"posts:{slug}"
+
+def invalidate_posts(*slugs: str) -> None:
+    """Call after commit: drops cached lists and the given post details in every worker."""
+    post_cache.invalidate(LIST_TAG, *(post_tag(slug) for slug in slugs))
+
+async def enqueue_derived(db: AsyncSession, post_id: int, related: bool = True) -> None:
+    """Queue the search index (and related posts) refresh in the write's transaction (see app.jobs)."""
+    await enqueue(db, "search", f"search:{post_id}", {"post_id": post_id})
+    if related:
+        await enqueue(db, "related", f"related:{post_id}", {"post_id": post_id})
+
+def post_response(post: Post, author: UserSnapshot) -> PostResponse:
+    """PostResponse for a flushed post with tags loaded, without reloading anything."""
+    return PostResponse.model_validate({
+        **{name: getattr(post, name) for name in PostResponse.model_fields if name != "author"},
+        "author": UserResponse.model_validate(author),
+    }, from_attributes=True)
 
 @router.get("", response_model=list[PostListResponse])
 async def list_posts(
+    request: Request,
     featured: Optional[bool] = None,
     tag: Optional[str] = None,
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = select(Post).options(selectinload(Post.author), selectinload(Post.tags))
+    cache_key = ("list", featured, tag, cursor, limit)
+    cached = post_cache.get(cache_key)
+    if cached is None:
+        generation = post_cache.generation(LIST_TAG)
+        after = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Geçersiz sayfa imleci")
+        # A removed post leaves max(updated_at) alone, so only the ETag decides
+        headers = validator_headers(*await page_version(db, featured=featured, tag=tag, after=after, limit=limit))
+        if is_not_modified(request, headers, modified_since=False):
+            return not_modified(headers)
+        body, next_cursor = await list_post_page(db, featured=featured, tag=tag, after=after, limit=limit)
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        cached = (body, headers)
+        post_cache.set(cache_key, LIST_TAG, generation, cached)
     
-    if featured is not None:
-        query = query.where(Post.featured == featured)
-    if tag:
-        query = query.join(Post.tags).where(Tag.name == tag)
+    body, headers = cached
+    if is_not_modified(request, headers, modified_since=False):
+        return not_modified(headers)
+    return json_payload(body, headers)
+
+@router.get("/search", response_model=list[PostSearchResponse])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    posts = await search_posts(db, q, limit + 1, offset)
+    headers = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        headers = {"X-Next-Offset": str(offset + limit)}
+    return model_response([
+        PostSearchResponse.model_validate(p).model_copy(update={"snippet": make_snippet(p, q)})
+        for p in posts
+    ], headers=headers)
+
+@router.get("/export")
+async def export(user: UserSnapshot = Depends(require_auth)):
+    """Every post as NDJSON (one PostRecord per line), streamed."""
+    async def stream():
+        # Own session: the request's sessions are closed before streaming ends
+        async with read_session() as db:
+            async for line in export_posts(db):
+                yield line
     
-    query = query.order_by(Post.created_at.desc())
-    result = await db.execute(query)
-    return [PostListResponse.model_validate(p) for p in result.scalars().all()]
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="posts.ndjson"'},
+    )
+
+@router.post("/import")
+async def import_(
+    request: Request,
+    user: UserSnapshot = Depends(require_auth)
+):
+    """Import NDJSON PostRecords as the current user; returns counts."""
+    try:
+        stats = await import_posts(write_queue.submit, iter_lines(request.stream()), author_id=user.id, keep_authors=False)
+    except RecordError as exc:
+        raise HTTPException(status_code=400, detail=f"Satır {exc.line_number} içe aktarılamadı: {exc.message}")
+    finally:
+        invalidate_posts()
+    return {"imported": stats.imported, "renamed": stats.renamed}
 
 @router.get("/{slug}", response_model=PostResponse)
-async def get_post(slug: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Post)
-        .options(selectinload(Post.author), selectinload(Post.tags))
-        .where(Post.slug == slug)
-    )
-    post = result.scalar_one_or_none()
-    if not post:
-        raise HTTPException(status_code=404, detail="Yazı bulunamadı")
-    return PostResponse.model_validate(post)
+async def get_post(slug: str, request: Request, db: AsyncSession = Depends(get_read_db)):
+    cache_key = ("post", slug)
+    cached = post_cache.get(cache_key)
+    if cached is None:
+        generation = post_cache.generation(post_tag(slug))
+        version = await post_version(db, slug)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Yazı bulunamadı")
+        headers = validator_headers(*version)
+        if is_not_modified(request, headers):
+            return not_modified(headers)
+        # Same read transaction as the validator, so the body matches its ETag
+        result = await db.execute(
+            select(Post)
+            .options(selectinload(Post.author), selectinload(Post.tags), undefer(Post.content), undefer(Post.content_html))
+            .where(Post.slug == slug)
+        )
+        body = json_bytes(PostResponse.model_validate(result.scalar_one()))
+        cached = (body, headers)
+        post_cache.set(cache_key, post_tag(slug), generation, cached)
+    
+    body, headers = cached
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+    return json_payload(body, headers)
+
+@router.get("/{slug}/related", response_model=list[PostListResponse])
+async def related_posts(
+    slug: str,
+    limit: int = Query(5, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Posts sharing the most (and rarest) tags with this one, precomputed by app.related."""
+    cache_key = ("related", slug, limit)
+    body = post_cache.get(cache_key)
+    if body is None:
+        # Any write can change a neighbour list, so these follow the list tag
+        generation = post_cache.generation(LIST_TAG)
+        post_id = await db.scalar(select(Post.id).where(Post.slug == slug))
+        if post_id is None:
+            raise HTTPException(status_code=404, detail="Yazı bulunamadı")
+        body = await list_related_page(db, post_id, limit)
+        post_cache.set(cache_key, LIST_TAG, generation, body)
+    return json_payload(body)
 
 @router.post("", response_model=PostResponse, status_code=201)
 async def create_post(
     data: PostCreate,
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(require_auth)
+    user: UserSnapshot = Depends(require_auth)
 ):
-    slug = slugify(data.title)
+    rendered = render_content(data.content)
     
-    # Check unique slug
-    result = await db.execute(select(Post).where(Post.slug == slug))
-    if result.scalar_one_or_none():
-        slug = f"{slug}-{user.id}"
+    async def write(db: AsyncSession) -> PostResponse:
+        slug = slugify(data.title)
+        
+        # Check unique slug
+        if await db.scalar(select(Post.id).where(Post.slug == slug)):
+            slug = f"{slug}-{user.id}"
+        
+        post = Post(
+            slug=slug,
+            title=data.title,
+            excerpt=data.excerpt or rendered.excerpt,
+            excerpt_custom=bool(data.excerpt),
+            content=data.content,
+            content_html=rendered.html,
+            word_count=rendered.word_count,
+            featured=data.featured,
+            read_time=rendered.read_time,
+            author_id=user.id
+        )
+        
+        post.tags = await resolve_tags(db, data.tags) if data.tags else []
+        
+        db.add(post)
+        await db.flush()
+        await enqueue_derived(db, post.id)
+        return post_response(post, user)
     
-    post = Post(
-        slug=slug,
-        title=data.title,
-        excerpt=data.excerpt or generate_excerpt(data.content),
-        content=data.content,
-        featured=data.featured,
-        read_time=calculate_read_time(data.content),
-        author_id=user.id
-    )
-    
-    if data.tags:
-        post.tags = await get_or_create_tags(db, data.tags)
-    
-    db.add(post)
-    await db.commit()
-    await db.refresh(post, ["author", "tags"])
-    return PostResponse.model_validate(post)
+    response = await write_queue.submit(write)
+    invalidate_posts(response.slug)
+    return model_response(response, status_code=201)
 
 @router.put("/{slug}", response_model=PostResponse)
 async def update_post(
     slug: str,
     data: PostUpdate,
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(require_auth)
+    user: UserSnapshot = Depends(require_auth)
 ):
-    result = await db.execute(
-        select(Post)
-        .options(selectinload(Post.tags))
-        .where(Post.slug == slug)
+    rendered = render_content(data.content) if data.content else None
+    
+    async def write(db: AsyncSession) -> PostResponse:
+        result = await db.execute(
+            select(Post)
+            .options(selectinload(Post.tags), undefer(Post.content), undefer(Post.content_html))
+            .where(Post.slug == slug)
+        )
+        post = result.scalar_one_or_none()
+        
+        if not post:
+            raise HTTPException(status_code=404, detail="Yazı bulunamadı")
+        if post.author_id != user.id:
+            raise HTTPException(status_code=403, detail="Bu yazıyı düzenleme yetkiniz yok")
+        
+        if data.title:
+            post.title = data.title
+            post.slug = slugify(data.title)
+        if rendered:
+            post.content = data.content
+            post.content_html = rendered.html
+            post.word_count = rendered.word_count
+            post.read_time = rendered.read_time
+            if not data.excerpt:
+                post.excerpt = rendered.excerpt
+                post.excerpt_custom = False
+        if data.excerpt is not None:
+            post.excerpt = data.excerpt
+            post.excerpt_custom = bool(data.excerpt)
+        if data.featured is not None:
+            post.featured = data.featured
+        if data.tags is not None:
+            post.tags = await resolve_tags(db, data.tags)
+        # Explicit: a tags-only change doesn't UPDATE the row, so onupdate wouldn't fire
+        post.updated_at = datetime.utcnow()
+        post.version += 1
+        
+        await db.flush()
+        await enqueue_derived(db, post.id, related=data.tags is not None)
+        return post_response(post, user)
+    
+    response = await write_queue.submit(write)
+    invalidate_posts(slug, response.slug)
+    return model_response(response)
+
+def stale_version(version: int) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail="Yazı bu sürümden sonra değiştirildi",
+        headers={"X-Post-Version": str(version)},
     )
-    post = result.scalar_one_or_none()
+
+@router.patch("/{slug}", response_model=PostPatchResponse)
+async def patch_post(
+    slug: str,
+    data: PostPatch,
+    user: UserSnapshot = Depends(require_auth)
+):
+    """Apply text edits to the content of version data.base_version.
     
-    if not post:
+    Only the edits are uploaded and only the new version comes back, so an
+    editor's autosave costs what was typed, not the whole post. A base that
+    is no longer current gets 409 with the current version in X-Post-Version.
+    """
+    async with async_session() as db:
+        row = (await db.execute(
+            select(Post.author_id, Post.version, Post.content).where(Post.slug == slug)
+        )).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Yazı bulunamadı")
-    if post.author_id != user.id:
+    if row.author_id != user.id:
         raise HTTPException(status_code=403, detail="Bu yazıyı düzenleme yetkiniz yok")
+    if row.version != data.base_version:
+        raise stale_version(row.version)
+    try:
+        content = apply_edits(row.content, [(edit.start, edit.end, edit.text) for edit in data.edits])
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Geçersiz düzenleme aralığı")
+    if not content.strip():
+        raise HTTPException(status_code=400, detail="İçerik boş olamaz")
+    # Rendered before queueing, like update_post; the writer re-checks the version
+    rendered = render_content(content)
     
-    if data.title:
-        post.title = data.title
-        post.slug = slugify(data.title)
-    if data.content:
-        post.content = data.content
-        post.read_time = calculate_read_time(data.content)
-        if not data.excerpt:
-            post.excerpt = generate_excerpt(data.content)
-    if data.excerpt is not None:
-        post.excerpt = data.excerpt
-    if data.featured is not None:
-        post.featured = data.featured
-    if data.tags is not None:
-        post.tags = await get_or_create_tags(db, data.tags)
+    async def write(db: AsyncSession) -> PostPatchResponse:
+        result = await db.execute(select(Post).where(Post.slug == slug))
+        post = result.scalar_one_or_none()
+        
+        if not post:
+            raise HTTPException(status_code=404, detail="Yazı bulunamadı")
+        if post.author_id != user.id:
+            raise HTTPException(status_code=403, detail="Bu yazıyı düzenleme yetkiniz yok")
+        if post.version != data.base_version:
+            raise stale_version(post.version)
+        
+        post.content = content
+        post.content_html = rendered.html
+        post.word_count = rendered.word_count
+        post.read_time = rendered.read_time
+        # A derived excerpt follows the content, as in update_post
+        if not post.excerpt_custom:
+            post.excerpt = rendered.excerpt
+        post.updated_at = datetime.utcnow()
+        post.version += 1
+        
+        await db.flush()
+        await enqueue_derived(db, post.id, related=False)
+        return PostPatchResponse.model_validate(post)
     
-    await db.commit()
-    await db.refresh(post, ["author", "tags"])
-    return PostResponse.model_validate(post)
+    response = await write_queue.submit(write)
+    invalidate_posts(slug)
+    return model_response(response)
 
 @router.delete("/{slug}", status_code=204)
 async def delete_post(
     slug: str,
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(require_auth)
+    user: UserSnapshot = Depends(require_auth)
 ):
-    result = await db.execute(select(Post).where(Post.slug == slug))
-    post = result.scalar_one_or_none()
-    
-    if not post:
-        raise HTTPException(status_code=404, detail="Yazı bulunamadı")
-    if post.author_id != user.id:
-        raise HTTPException(status_code=403, detail="Bu yazıyı silme yetkiniz yok")
+    async def write(db: AsyncSession) -> None:
+        result = await db.execute(select(Post).where(Post.slug == slug))
+        post = result.scalar_one_or_none()
+        
+        if not post:
+            raise HTTPException(status_code=404, detail="Yazı bulunamadı")
+        if post.author_id != user.id:
+            raise HTTPException(status_code=403, detail="Bu yazıyı silme yetkiniz yok")
+        
+        await db.delete(post)
+        await db.flush()
+        await enqueue_derived(db, post.id)
     
-    await db.delete(post)
-    await db.commit()
+    await write_queue.submit(write)
+    invalidate_posts(slug)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.database import get_read_db
+from app.schemas import TagCountResponse
+from app.responses import model_response
+from app.tags import tag_counts
+
+router = APIRouter(prefix="/api/tags", tags=["tags"])
+
+@router.get("", response_model=list[TagCountResponse])
+async def list_tags(
+    featured: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Tags in use with their post counts (featured posts only with ?featured=true)."""
+    rows = await tag_counts(db, featured=featured, limit=limit)
+    return model_response([TagCountResponse(id=tag_id, name=name, post_count=count) for tag_id, name, count in rows])
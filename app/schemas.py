@@ -36,6 +36,9 @@ class TagResponse(TagBase):
     class Config:
         from_attributes = True
 
+class TagCountResponse(TagResponse):
+    post_count: int
+
 # ============ Posts ============
 class PostCreate(BaseModel):
     title: str = Field(..., min_length=3, max_length=255)
@@ -51,14 +54,37 @@ class PostUpdate(BaseModel):
     tags: Optional[list[str]] = None
     featured: Optional[bool] = None
 
+class TextEdit(BaseModel):
+    """Replace content[start:end] (character offsets into the base) with text."""
+    start: int = Field(..., ge=0)
+    end: int = Field(..., ge=0)
+    text: str = ""
+
+class PostPatch(BaseModel):
+    base_version: int  # PostResponse.version the edits were made against
+    edits: list[TextEdit] = Field(..., min_length=1)
+
+class PostPatchResponse(BaseModel):
+    slug: str
+    version: int
+    word_count: Optional[int] = None
+    read_time: str
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
 class PostResponse(BaseModel):
     id: int
     slug: str
     title: str
     excerpt: Optional[str]
     content: str
+    content_html: Optional[str] = None
+    word_count: Optional[int] = None
     featured: bool
     read_time: str
+    version: int = 1
     created_at: datetime
     updated_at: datetime
     author: UserResponse
@@ -80,3 +106,24 @@ class PostListResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+class PostSearchResponse(PostListResponse):
+    snippet: str = ""  # HTML-escaped, matches wrapped in <mark>
+
+# ============ Import / Export (NDJSON, one post per line) ============
+class AuthorRecord(BaseModel):
+    email: EmailStr
+    name: str = Field(..., min_length=1, max_length=100)
+    avatar: Optional[str] = None
+    provider: str = "email"
+
+class PostRecord(BaseModel):
+    slug: Optional[str] = None
+    title: str = Field(..., min_length=1, max_length=255)
+    excerpt: Optional[str] = None
+    content: str = Field(..., min_length=1)
+    featured: bool = False
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    author: Optional[AuthorRecord] = None
+    tags: list[str] = []
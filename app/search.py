@@ -0,0 +1,142 @@
+"""Full-text search over posts backed by the posts_fts FTS5 table.
+
+Bodies are indexed and snippeted as the plain text app.content extracts,
+so editor HTML and Markdown syntax never match a query. Text is folded with
+app.utils.fold_text before indexing and querying, so "Işık", "ışık" and
+"isik" all match each other.
+"""
+import re
+from html import escape
+from sqlalchemy import column, delete, func, insert, literal_column, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, undefer
+from app.content import render_content
+from app.models import Post
+from app.utils import fold_text
+
+posts_fts = table(
+    "posts_fts",
+    column("rowid"), column("title"), column("excerpt"), column("content"), column("tags"),
+)
+
+# bm25 column weights: title, excerpt, content, tags
+RANK = func.bm25(literal_column("posts_fts"), 10.0, 4.0, 1.0, 6.0)
+
+def query_terms(query: str) -> list[str]:
+    return re.findall(r'\w+', fold_text(query))
+
+async def index_post(db: AsyncSession, post: Post) -> None:
+    """Replace the index row for a post. The post must be flushed with tags loaded."""
+    await index_posts(db, [post])
+
+async def index_posts(db: AsyncSession, posts: list[Post]) -> None:
+    """Bulk form of index_post: one DELETE and one executemany INSERT."""
+    if not posts:
+        return
+    await db.execute(delete(posts_fts).where(posts_fts.c.rowid.in_([post.id for post in posts])))
+    await db.execute(insert(posts_fts), [
+        {
+            "rowid": post.id,
+            "title": fold_text(post.title),
+            "excerpt": fold_text(post.excerpt or ""),
+            "content": fold_text(render_content(post.content).text),
+            "tags": fold_text(" ".join(tag.name for tag in post.tags)),
+        }
+        for post in posts
+    ])
+
+async def unindex_post(db: AsyncSession, post_id: int) -> None:
+    await db.execute(delete(posts_fts).where(posts_fts.c.rowid == post_id))
+
+async def reindex_post(db: AsyncSession, post_id: int) -> None:
+    """Make the index row match the post as it is now; drop it if the post is gone."""
+    result = await db.execute(
+        select(Post).options(selectinload(Post.tags), undefer(Post.content)).where(Post.id == post_id)
+    )
+    post = result.scalar_one_or_none()
+    if post is None:
+        await unindex_post(db, post_id)
+    else:
+        await index_post(db, post)
+
+async def search_posts(db: AsyncSession, query: str, limit: int, offset: int = 0) -> list[Post]:
+    """Posts matching every term (as a prefix), best bm25 rank first."""
+    terms = query_terms(query)
+    if not terms:
+        return []
+    match = " ".join(f'"{term}"*' for term in terms)
+    hits = (
+        select(posts_fts.c.rowid.label("post_id"), RANK.label("rank"))
+        .where(text("posts_fts MATCH :match").bindparams(match=match))
+        .subquery()
+    )
+    result = await db.execute(
+        select(Post)
+        .join(hits, hits.c.post_id == Post.id)
+        .options(selectinload(Post.author), selectinload(Post.tags), undefer(Post.content))
+        .order_by(hits.c.rank, Post.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return list(result.scalars().all())
+
+def make_snippet(post: Post, query: str, width: int = 160) -> str:
+    """HTML-escaped excerpt of the best matching field with hits wrapped in <mark>."""
+    terms = query_terms(query)
+    pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, terms)) + r')\w*') if terms else None
+    fallback = post.excerpt or post.title
+    for source in (render_content(post.content).text, post.excerpt or "", post.title):
+        match = pattern.search(fold_text(source)) if pattern else None
+        if match:
+            break
+    else:
+        source = fallback
+
+    start = 0
+    if match and match.start() > width // 4:
+        start = source.rfind(" ", 0, match.start() - width // 4) + 1
+    end = len(source) if len(source) - start <= width else source.rfind(" ", start, start + width)
+    if end <= start:
+        end = min(len(source), start + width)
+    window = source[start:end]
+
+    parts = []
+    last = 0
+    if pattern:
+        for hit in pattern.finditer(fold_text(window)):
+            parts.append(escape(window[last:hit.start()]))
+            parts.append(f"<mark>{escape(window[hit.start():hit.end()])}</mark>")
+            last = hit.end()
+    parts.append(escape(window[last:]))
+    return ("..." if start > 0 else "") + "".join(parts) + ("..." if end < len(source) else "")
+
+async def build_search_index(db: AsyncSession, batch_size: int = 500) -> int:
+    """Re-index every post from scratch. Returns the number of posts indexed."""
+    await db.execute(delete(posts_fts))
+    count = 0
+    last_id = 0
+    while True:
+        result = await db.execute(
+            select(Post).options(selectinload(Post.tags), undefer(Post.content))
+            .where(Post.id > last_id).order_by(Post.id).limit(batch_size)
+        )
+        batch = result.scalars().all()
+        if not batch:
+            break
+        await index_posts(db, batch)
+        count += len(batch)
+        last_id = batch[-1].id
+        db.expunge_all()
+    await db.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('optimize')"))
+    await db.commit()
+    return count
+
+async def rebuild_search_index() -> int:
+    from app.database import async_session, init_db
+    await init_db()
+    async with async_session() as db:
+        return await build_search_index(db)
+
+if __name__ == "__main__":
+    import asyncio
+    print(f"Indexed {asyncio.run(rebuild_search_index())} posts.")
@@ -1,8 +1,12 @@
 """Seed database with initial data."""
 from sqlalchemy import select
 from app.database import async_session
-from app.models import User, Post, Tag
+from app.models import User, Post
 from app.auth import hash_password
+from app.search import index_post
+from app.related import update_related
+from app.tags import resolve_tags
+from app.content import render_content
 
 DEMO_POSTS = [
     {
@@ -117,37 +121,37 @@ async def seed_database():
         demo_user = User(
             name="Demo Yazar",
             email="demo@blog.com",
-            hashed_password=hash_password("demo123"),
+            hashed_password=await hash_password("demo123"),
             provider="email"
         )
         db.add(demo_user)
         await db.flush()
         
-        # Create tags and posts
-        tag_cache = {}
+        # Create all tags in one batch, then the posts
+        all_tags = await resolve_tags(db, [name for post_data in DEMO_POSTS for name in post_data["tags"]])
+        tag_cache = {tag.name: tag for tag in all_tags}
         for post_data in DEMO_POSTS:
-            # Get or create tags
-            post_tags = []
-            for tag_name in post_data["tags"]:
-                if tag_name not in tag_cache:
-                    tag = Tag(name=tag_name)
-                    db.add(tag)
-                    await db.flush()
-                    tag_cache[tag_name] = tag
-                post_tags.append(tag_cache[tag_name])
+            post_tags = [tag_cache[name] for name in post_data["tags"]]
             
             # Create post
+            rendered = render_content(post_data["content"])
             post = Post(
                 title=post_data["title"],
                 slug=post_data["slug"],
                 excerpt=post_data["excerpt"],
+                excerpt_custom=True,
                 content=post_data["content"],
+                content_html=rendered.html,
+                word_count=rendered.word_count,
                 featured=post_data["featured"],
                 read_time=post_data["read_time"],
                 author_id=demo_user.id,
                 tags=post_tags
             )
             db.add(post)
+            await db.flush()
+            await index_post(db, post)
+            await update_related(db, post.id)
         
         await db.commit()
         print("Database seeded successfully!")
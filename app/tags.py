@@ -0,0 +1,113 @@
+"""Set-based tag resolution and tag counters.
+
+    python -m app.tags   # recompute post_count / featured_count
+"""
+from sqlalchemy import delete, event, func, literal_column, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models import Post, Tag, post_tags
+
+# Tags are never renamed or deleted, so name -> id is safe to remember for
+# the life of the worker once committed. Bounded so a flood of one-off tags
+# can't grow it.
+TAG_ID_CACHE_SIZE = 10_000
+_tag_ids: dict[str, int] = {}
+
+def _remember(tag_ids: dict[str, int]) -> None:
+    if len(_tag_ids) + len(tag_ids) > TAG_ID_CACHE_SIZE:
+        _tag_ids.clear()
+    _tag_ids.update(tag_ids)
+
+# A tag inserted by a write that rolls back frees its id for another tag,
+# so ids are remembered only once the session commits
+@event.listens_for(Session, "after_commit")
+def _remember_committed(session: Session) -> None:
+    if tag_ids := session.info.pop("tag_ids", None):
+        _remember(tag_ids)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_uncommitted(session: Session) -> None:
+    session.info.pop("tag_ids", None)
+
+async def resolve_tags(db: AsyncSession, tag_names: list[str]) -> list[Tag]:
+    """Return Tag rows for the names (in order, de-duplicated), creating missing ones.
+
+    At most two round trips whatever the number of tags: a lookup by cached
+    id when every name is known, otherwise one INSERT ... ON CONFLICT DO
+    NOTHING followed by one IN select. Concurrent writers adding the same new
+    tag both end up with the single surviving row instead of an
+    IntegrityError.
+    """
+    names = list(dict.fromkeys(tag_names))
+    if not names:
+        return []
+
+    by_name: dict[str, Tag] = {}
+    known_ids = [_tag_ids[name] for name in names if name in _tag_ids]
+    if len(known_ids) == len(names):
+        result = await db.execute(select(Tag).where(Tag.id.in_(known_ids)))
+        by_name = {tag.name: tag for tag in result.scalars()}
+
+    # Names, not just a count: a stale id may now belong to another tag
+    if set(by_name) != set(names):
+        await db.execute(
+            sqlite_insert(Tag)
+            .values([{"name": name} for name in names])
+            .on_conflict_do_nothing(index_elements=[Tag.name])
+        )
+        result = await db.execute(select(Tag).where(Tag.name.in_(names)))
+        by_name = {tag.name: tag for tag in result.scalars()}
+        db.info.setdefault("tag_ids", {}).update((tag.name, tag.id) for tag in by_name.values())
+
+    return [by_name[name] for name in names]
+
+def recount_tags(sync_conn) -> int:
+    """Recompute every tag's counters from post_tags; returns how many were wrong.
+
+    The triggers in app.models keep the counters current, so this is only a
+    repair for drift (rows written with triggers absent, manual edits).
+    Sync so init_db can run it inside its migration transaction.
+    """
+    linked = select(func.count(post_tags.c.post_id.distinct())).where(post_tags.c.tag_id == Tag.id)
+    post_count = linked.scalar_subquery()
+    featured_count = (
+        linked.join_from(post_tags, Post, Post.id == post_tags.c.post_id)
+        .where(Post.featured.is_(True))
+        .scalar_subquery()
+    )
+    result = sync_conn.execute(
+        update(Tag)
+        .where(or_(Tag.post_count.is_distinct_from(post_count), Tag.featured_count.is_distinct_from(featured_count)))
+        .values(post_count=post_count, featured_count=featured_count)
+    )
+    return result.rowcount
+
+def dedupe_post_tags(sync_conn) -> int:
+    """Delete repeated (post_id, tag_id) links, keeping the first; returns how many.
+    
+    Older databases had no unique index on post_tags. The delete trigger
+    takes the extra links back out of the tag counters.
+    """
+    rowid = literal_column("rowid")
+    first = select(func.min(rowid)).select_from(post_tags).group_by(post_tags.c.post_id, post_tags.c.tag_id)
+    return sync_conn.execute(delete(post_tags).where(rowid.not_in(first))).rowcount
+
+async def tag_counts(db: AsyncSession, featured: bool = False, limit: int = None) -> list[tuple[int, str, int]]:
+    """(id, name, count) for tags in use, most used first. Reads only the tags table."""
+    count = Tag.featured_count if featured else Tag.post_count
+    query = select(Tag.id, Tag.name, count).where(count > 0).order_by(count.desc(), Tag.name)
+    if limit:
+        query = query.limit(limit)
+    return list((await db.execute(query)).all())
+
+async def _main() -> None:
+    from app.database import engine, init_db
+    await init_db()
+    async with engine.begin() as conn:
+        repaired = await conn.run_sync(recount_tags)
+    print(f"Repaired counters of {repaired} tags.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(_main())
@@ -0,0 +1,285 @@
+"""Streaming NDJSON export and batched import of posts.
+
+One JSON object per line in the PostRecord shape (see app.schemas). Export
+streams rows from a server-side cursor; import validates and renders a
+batch at a time and inserts it as one app.writer operation, so memory
+stays flat whatever the archive size and the write lock is held for one
+small batch at a time. Search indexing and related posts are queued as
+app.jobs, like any other write.
+
+    python -m app.transfer export [FILE]   # default: stdout
+    python -m app.transfer import [FILE]   # default: stdin
+"""
+import json
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.content import RenderedContent, render_content
+from app.jobs import enqueue
+from app.models import Post, Tag, User, post_tags
+from app.schemas import PostRecord
+from app.tags import resolve_tags
+from app.utils import slugify
+
+IMPORT_BATCH_SIZE = 100
+EXPORT_BATCH_SIZE = 500
+
+class RecordError(ValueError):
+    """A line could not be imported; nothing from its batch was written."""
+
+    def __init__(self, line_number: int, message: str):
+        super().__init__(f"line {line_number}: {message}")
+        self.line_number = line_number
+        self.message = message
+
+@dataclass
+class ImportStats:
+    imported: int = 0
+    renamed: int = 0
+    authors_created: int = 0
+
+    def add(self, other: "ImportStats") -> None:
+        self.imported += other.imported
+        self.renamed += other.renamed
+        self.authors_created += other.authors_created
+
+# Runs op(db) in a transaction of its own and returns its result, e.g.
+# app.writer.write_queue.submit
+Submit = Callable[[Callable[[AsyncSession], Awaitable]], Awaitable]
+
+# ============ Export ============
+_tag_names = (
+    select(func.json_group_array(Tag.name.distinct()))
+    .select_from(post_tags.join(Tag, Tag.id == post_tags.c.tag_id))
+    .where(post_tags.c.post_id == Post.id)
+    .scalar_subquery()
+)
+
+async def export_posts(db: AsyncSession) -> AsyncIterator[bytes]:
+    """Yield one NDJSON line per post, oldest first."""
+    result = await db.stream(
+        select(
+            Post.slug, Post.title, Post.excerpt, Post.content, Post.featured,
+            Post.created_at, Post.updated_at,
+            User.email, User.name, User.avatar, User.provider,
+            _tag_names,
+        )
+        .join(User, User.id == Post.author_id)
+        .order_by(Post.created_at, Post.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    async for (slug, title, excerpt, content, featured, created_at, updated_at,
+               email, name, avatar, provider, tags) in result:
+        record = {
+            "slug": slug,
+            "title": title,
+            "excerpt": excerpt,
+            "content": content,
+            "featured": bool(featured),
+            "created_at": created_at.isoformat() if created_at else None,
+            "updated_at": updated_at.isoformat() if updated_at else None,
+            "author": {"email": email, "name": name, "avatar": avatar, "provider": provider},
+            "tags": json.loads(tags),
+        }
+        yield json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+# ============ Import ============
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines without holding more than one line."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+async def _resolve_authors(db: AsyncSession, records: list[PostRecord], stats: ImportStats) -> dict[str, int]:
+    authors = {record.author.email: record.author for record in records if record.author}
+    if not authors:
+        return {}
+    result = await db.execute(select(User.email, User.id).where(User.email.in_(authors)))
+    ids = dict(result.all())
+    missing = [author for email, author in authors.items() if email not in ids]
+    if missing:
+        # Imported authors have no password, like OAuth users
+        await db.execute(
+            sqlite_insert(User)
+            .values([
+                {"email": a.email, "name": a.name, "avatar": a.avatar, "provider": a.provider,
+                 "hashed_password": "", "created_at": datetime.utcnow()}
+                for a in missing
+            ])
+            .on_conflict_do_nothing(index_elements=[User.email])
+        )
+        result = await db.execute(select(User.email, User.id).where(User.email.in_([a.email for a in missing])))
+        created = dict(result.all())
+        stats.authors_created += len(created)
+        ids.update(created)
+    return ids
+
+async def _unique_slugs(db: AsyncSession, wanted: list[str]) -> list[str]:
+    """Resolve collisions with existing rows and within the batch, -2, -3, ... style.
+
+    Each round checks the next suffix for every still-unresolved slug with a
+    single IN query, so a batch costs as many queries as its worst collision
+    chain, not one per post.
+    """
+    remaining = Counter(wanted)
+    assigned: dict[str, list[str]] = {base: [] for base in remaining}
+    taken: set[str] = set()
+    suffix = 1
+    while remaining:
+        candidates = {base: base if suffix == 1 else f"{base}-{suffix}" for base in remaining}
+        result = await db.execute(select(Post.slug).where(Post.slug.in_(candidates.values())))
+        existing = set(result.scalars())
+        for base, candidate in candidates.items():
+            if candidate in existing or candidate in taken:
+                continue
+            assigned[base].append(candidate)
+            taken.add(candidate)
+            remaining[base] -= 1
+            if not remaining[base]:
+                del remaining[base]
+        suffix += 1
+    picks = {base: iter(slugs) for base, slugs in assigned.items()}
+    return [next(picks[base]) for base in wanted]
+
+async def _import_batch(
+    db: AsyncSession,
+    batch: list[tuple[int, PostRecord, RenderedContent]],
+    default_author_id: Optional[int],
+) -> ImportStats:
+    stats = ImportStats()
+    records = [record for _, record, _ in batch]
+    author_ids = await _resolve_authors(db, records, stats)
+    wanted = [slugify(record.slug or record.title) or "yazi" for record in records]
+    slugs = await _unique_slugs(db, wanted)
+    stats.renamed += sum(1 for a, b in zip(wanted, slugs) if a != b)
+
+    tags = await resolve_tags(db, [name for record in records for name in record.tags])
+    tags_by_name = {tag.name: tag for tag in tags}
+
+    posts = []
+    now = datetime.utcnow()
+    for (line_number, record, rendered), slug in zip(batch, slugs):
+        author_id = author_ids[record.author.email] if record.author else default_author_id
+        if author_id is None:
+            raise RecordError(line_number, "author is required")
+        posts.append(Post(
+            slug=slug,
+            title=record.title,
+            excerpt=record.excerpt or rendered.excerpt,
+            # Exports carry derived excerpts too; only a different one was written
+            excerpt_custom=bool(record.excerpt) and record.excerpt != rendered.excerpt,
+            content=record.content,
+            content_html=rendered.html,
+            word_count=rendered.word_count,
+            featured=record.featured,
+            read_time=rendered.read_time,
+            created_at=record.created_at or now,
+            updated_at=record.updated_at or record.created_at or now,
+            author_id=author_id,
+            tags=[tags_by_name[name] for name in dict.fromkeys(record.tags)],
+        ))
+    db.add_all(posts)
+    await db.flush()
+    # Searchable first: the worker takes jobs in order and related ones cost more
+    for kind in ("search", "related"):
+        for post in posts:
+            await enqueue(db, kind, f"{kind}:{post.id}", {"post_id": post.id})
+    stats.imported += len(posts)
+    return stats
+
+async def import_posts(
+    submit: Submit,
+    lines: AsyncIterator[bytes],
+    author_id: Optional[int] = None,
+    keep_authors: bool = True,
+) -> ImportStats:
+    """Insert posts from NDJSON lines, one submit() per IMPORT_BATCH_SIZE posts.
+
+    With keep_authors=False every post is attributed to author_id, ignoring
+    the author in the record. A bad line raises RecordError; batches before
+    it stay committed.
+    """
+    stats = ImportStats()
+    batch: list[tuple[int, PostRecord, RenderedContent]] = []
+
+    async def flush() -> None:
+        # Rendered above, outside the write lock; only the inserts run in it
+        prepared = batch.copy()
+        stats.add(await submit(lambda db: _import_batch(db, prepared, author_id)))
+        batch.clear()
+
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            record = PostRecord.model_validate_json(line)
+        except ValidationError as exc:
+            raise RecordError(line_number, exc.errors()[0]["msg"]) from exc
+        if not keep_authors:
+            record.author = None
+        batch.append((line_number, record, render_content(record.content)))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+    return stats
+
+async def _main(argv: list[str]) -> None:
+    import argparse
+    import sys
+    from app.database import async_session, init_db
+    from app.jobs import job_worker, run_due_jobs
+    from app.routers.posts import invalidate_posts
+    from app.writer import write_queue
+
+    parser = argparse.ArgumentParser(prog="python -m app.transfer", description="NDJSON import/export of posts")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("file", nargs="?", help="defaults to stdout/stdin")
+    args = parser.parse_args(argv)
+    await init_db()
+
+    async with async_session() as db:
+        if args.command == "export":
+            out = open(args.file, "wb") if args.file else sys.stdout.buffer
+            try:
+                async for line in export_posts(db):
+                    out.write(line)
+            finally:
+                if args.file:
+                    out.close()
+            return
+
+        source = open(args.file, "rb") if args.file else sys.stdin.buffer
+
+        async def read_lines() -> AsyncIterator[bytes]:
+            for line in source:
+                yield line.rstrip(b"\n")
+
+        try:
+            stats = await import_posts(write_queue.submit, read_lines())
+        except RecordError as exc:
+            sys.exit(f"Import failed at {exc}")
+        finally:
+            await job_worker.close()
+            await write_queue.close()
+            # Index and relate what the worker has not reached before exiting
+            await run_due_jobs()
+            invalidate_posts()
+        print(json.dumps(asdict(stats)), file=sys.stderr)
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+    asyncio.run(_main(sys.argv[1:]))
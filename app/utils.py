@@ -1,38 +1,69 @@
+import base64
+import json
 import re
 import unicodedata
+from datetime import datetime
+
+# Turkish letters with no NFKD decomposition to ASCII
+TR_MAP = {
+    'ı': 'i', 'İ': 'i', 'ğ': 'g', 'Ğ': 'g',
+    'ü': 'u', 'Ü': 'u', 'ş': 's', 'Ş': 's',
+    'ö': 'o', 'Ö': 'o', 'ç': 'c', 'Ç': 'c'
+}
+_TR_TABLE = str.maketrans(TR_MAP)
 
 def slugify(text: str) -> str:
     """Convert text to URL-friendly slug."""
-    # Turkish character mapping
-    tr_map = {
-        'ı': 'i', 'İ': 'i', 'ğ': 'g', 'Ğ': 'g',
-        'ü': 'u', 'Ü': 'u', 'ş': 's', 'Ş': 's',
-        'ö': 'o', 'Ö': 'o', 'ç': 'c', 'Ç': 'c'
-    }
-    for tr, en in tr_map.items():
-        text = text.replace(tr, en)
-    
+    text = text.translate(_TR_TABLE)
     text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
     text = re.sub(r'[^\w\s-]', '', text.lower())
     return re.sub(r'[-\s]+', '-', text).strip('-')
 
-def calculate_read_time(content: str) -> str:
-    """Calculate estimated reading time."""
-    words = len(content.split())
-    minutes = max(1, round(words / 200))
-    return f"{minutes} dk"
+def fold_text(text: str) -> str:
+    """Fold case, Turkish letters and diacritics the way slugify does.
+    
+    Output has exactly one character per input character, so offsets found in
+    the folded text can be used to slice the original.
+    """
+    text = text.translate(_TR_TABLE)
+    if text.isascii():
+        return text.lower()
+    folded = []
+    for ch in text:
+        base = unicodedata.normalize('NFKD', ch).encode('ascii', 'ignore').decode('ascii')
+        if len(base) == 1:
+            folded.append(base.lower())
+        else:
+            lower = ch.lower()
+            folded.append(lower if len(lower) == 1 else ch)
+    return ''.join(folded)
 
-def generate_excerpt(content: str, max_length: int = 160) -> str:
-    """Generate excerpt from content."""
-    # Remove markdown
-    text = re.sub(r'#+ ', '', content)
-    text = re.sub(r'\*\*|__', '', text)
-    text = re.sub(r'\*|_', '', text)
-    text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)
-    text = re.sub(r'```[\s\S]*?```', '', text)
-    text = re.sub(r'`[^`]+`', '', text)
-    text = ' '.join(text.split())
+def apply_edits(text: str, edits: list[tuple[int, int, str]]) -> str:
+    """Replace text[start:end] with each edit's text.
     
-    if len(text) <= max_length:
-        return text
-    return text[:max_length].rsplit(' ', 1)[0] + '...'
+    Offsets are in characters of the original text; edits must be sorted
+    and must not overlap. Raises ValueError otherwise.
+    """
+    parts = []
+    position = 0
+    for start, end, replacement in edits:
+        if not position <= start <= end <= len(text):
+            raise ValueError("edits out of order or out of range")
+        parts += [text[position:start], replacement]
+        position = end
+    parts.append(text[position:])
+    return ''.join(parts)
+
+def encode_cursor(created_at: datetime, post_id: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque cursor."""
+    raw = json.dumps([created_at.isoformat(), post_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor. Raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, post_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(post_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("invalid cursor") from exc
@@ -0,0 +1,164 @@
+"""Single writer task that group-commits concurrent write operations.
+
+SQLite has one write lock. Instead of every handler opening its own write
+transaction and queueing on that lock, handlers submit an operation, an
+async callable taking a session, and await its result. One writer task per
+worker drains the queue, runs each pending operation in its own SAVEPOINT
+and commits the whole batch once:
+
+    async def op(db: AsyncSession) -> PostResponse: ...
+    response = await write_queue.submit(op)
+
+An operation that raises is rolled back to its savepoint and its exception
+is re-raised in the submitting handler; the rest of the batch still
+commits. If the commit itself fails, each operation is retried alone so one
+bad write cannot fail its neighbours. submit() returns only after the
+commit, so handlers can invalidate caches straight afterwards.
+
+The queue is bounded: when it is full, submit() refuses with 503 rather
+than letting requests pile up without limit.
+"""
+import asyncio
+import contextvars
+from typing import Awaitable, Callable, Coroutine, Optional, TypeVar
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.config import get_settings
+from app.database import write_session
+
+T = TypeVar("T")
+Operation = Callable[[AsyncSession], Awaitable[T]]
+
+settings = get_settings()
+
+class LoopTask:
+    """A background task bound to the event loop that started it.
+
+    Started lazily, and again if the event loop changed (tests, CLIs).
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bound(self) -> bool:
+        """Whether the task was started on the running loop."""
+        return self._task is not None and self._loop is asyncio.get_running_loop()
+
+    def needs_start(self) -> bool:
+        return not self.bound() or self._task.done()
+
+    def start(self, coro: Coroutine) -> None:
+        self._loop = asyncio.get_running_loop()
+        # Empty context: the task must not inherit the request that happened to start it
+        self._task = self._loop.create_task(coro, name=self.name, context=contextvars.Context())
+
+    async def stop(self) -> None:
+        if not self.bound():
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+class WriteQueue:
+    def __init__(self, session_factory: async_sessionmaker, max_pending: int = 256, max_batch: int = 64):
+        self.session_factory = session_factory
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._runner = LoopTask("write-queue")
+
+    def _ensure_started(self) -> asyncio.Queue:
+        if self._runner.needs_start():
+            self._queue = asyncio.Queue(self.max_pending)
+            self._runner.start(self._run(self._queue))
+        return self._queue
+
+    async def submit(self, operation: Operation[T]) -> T:
+        """Run operation(db) in the next group commit and return its result."""
+        queue = self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            queue.put_nowait((operation, future, contextvars.copy_context()))
+        except asyncio.QueueFull:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Sunucu meşgul, lütfen tekrar deneyin",
+                headers={"Retry-After": "1"},
+            )
+        return await future
+
+    def waiting(self) -> int:
+        """Operations queued behind the batch being committed."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def close(self) -> None:
+        """Finish everything already queued, then stop the writer task."""
+        if not self._runner.bound():
+            return
+        await self._queue.join()
+        await self._runner.stop()
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await self._commit_batch(batch)
+            except Exception as exc:  # never let the writer die
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _commit_batch(self, batch: list) -> None:
+        # Operations whose handler already gave up (client disconnected) are skipped
+        batch = [entry for entry in batch if not entry[1].done()]
+        if not batch:
+            return
+        results = {}
+        async with self.session_factory() as db:
+            for operation, future, context in batch:
+                try:
+                    async with db.begin_nested():
+                        # In the submitter's context, so per-request state
+                        # (e.g. app.metrics query counts) follows the operation
+                        results[future] = await asyncio.create_task(operation(db), context=context)
+                except Exception as exc:
+                    if not future.done():
+                        future.set_exception(exc)
+            if not results:
+                await db.rollback()
+                return
+            try:
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                if len(results) == 1:
+                    raise
+                # Isolate the failure: retry every surviving operation on its own
+                for entry in batch:
+                    future = entry[1]
+                    if future not in results:
+                        continue
+                    try:
+                        await self._commit_batch([entry])
+                    except Exception as exc:
+                        if not future.done():
+                            future.set_exception(exc)
+                return
+        for future, result in results.items():
+            if not future.done():
+                future.set_result(result)
+
+write_queue = WriteQueue(
+    write_session,
+    max_pending=settings.write_queue_max_pending,
+    max_batch=settings.write_queue_max_batch,
+)
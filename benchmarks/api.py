@@ -0,0 +1,257 @@
+"""Throughput and latency of the main API endpoints at several archive sizes.
+
+    python -m benchmarks.api [--sizes 1000,10000,100000] [--requests 500]
+                             [--concurrency 16] [--save results.json]
+                             [--baseline baseline.json] [--threshold 0.25]
+
+Drives app.main:app in-process through httpx's ASGI transport against a
+temporary SQLite database. The archive is grown to each size in turn and
+every scenario below is run against it; results (requests/s and
+p50/p95/p99 in ms) are printed and optionally saved as JSON.
+
+With --baseline, each metric is compared to the saved run and the command
+exits with status 1, printing a diff, if any latency grew or any
+throughput fell by more than --threshold (a fraction, 0.25 = 25%).
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from benchmarks.support import percentiles, use_temp_database
+
+SEED_CONTENT = (
+    "## Giriş\n\nBu yazı **performans** ölçümleri için üretilmiş örnek bir içeriktir. "
+    "Şehirdeki ışıklar, ağaçların gölgesi ve çay bahçesindeki sohbetler.\n\n"
+    "- birinci madde\n- ikinci madde\n\n" + "Uzun bir paragraf cümlesi burada tekrar ediyor. " * 60
+)
+TAG_POOL = [f"etiket-{i}" for i in range(200)]
+LATENCY_METRICS = ("p50", "p95", "p99")
+
+# ============ Archive ============
+async def grow_archive(target: int, batch: int = 5000) -> int:
+    """Insert synthetic posts (bulk, bypassing the API) until there are `target`.
+
+    Returns how many bench-N posts exist; slugs run from bench-1 upwards.
+    """
+    from sqlalchemy import func, insert, select
+    from app.content import render_content
+    from app.database import async_session
+    from app.models import Post, User, post_tags
+    from app.search import posts_fts
+    from app.tags import resolve_tags
+    from app.utils import fold_text
+
+    rendered = render_content(SEED_CONTENT)
+    folded_content = fold_text(rendered.text)
+    async with async_session() as db:
+        count = await db.scalar(select(func.count()).select_from(Post))
+        author_id = await db.scalar(select(User.id).where(User.email == "demo@blog.com"))
+        tag_ids = [tag.id for tag in await resolve_tags(db, TAG_POOL)]
+        start = datetime.utcnow() - timedelta(days=3650)
+        rng = random.Random(count)
+        bench = await db.scalar(select(func.count()).select_from(Post).where(Post.slug.like("bench-%")))
+        while count < target:
+            n = min(batch, target - count)
+            first = await db.scalar(select(func.coalesce(func.max(Post.id), 0))) + 1
+            ids = range(first, first + n)
+            slugs = {i: f"bench-{bench + i - first + 1}" for i in ids}
+            await db.execute(insert(Post), [
+                {
+                    "id": i, "slug": slugs[i], "title": f"Ölçüm yazısı {i}",
+                    "excerpt": rendered.excerpt, "content": SEED_CONTENT, "content_html": rendered.html,
+                    "word_count": rendered.word_count, "read_time": rendered.read_time,
+                    "featured": i % 25 == 0, "author_id": author_id,
+                    "created_at": start + timedelta(minutes=i), "updated_at": start + timedelta(minutes=i),
+                }
+                for i in ids
+            ])
+            await db.execute(insert(post_tags), [
+                {"post_id": i, "tag_id": tag_id} for i in ids for tag_id in rng.sample(tag_ids, 3)
+            ])
+            await db.execute(insert(posts_fts), [
+                {"rowid": i, "title": fold_text(f"Ölçüm yazısı {i}"), "excerpt": fold_text(rendered.excerpt),
+                 "content": folded_content, "tags": ""}
+                for i in ids
+            ])
+            await db.commit()
+            count += n
+            bench += n
+    return bench
+
+# ============ Scenarios ============
+class Context:
+    def __init__(self, client, token: str, posts: int):
+        self.client = client
+        self.auth = {"Authorization": f"Bearer {token}"}
+        self.posts = posts
+        self.rng = random.Random(posts)
+        self.created: list[str] = []
+
+    def slug(self) -> str:
+        return f"bench-{self.rng.randint(1, self.posts)}"
+
+async def list_anonymous(ctx: Context):
+    params = {"limit": 20}
+    roll = ctx.rng.random()
+    if roll < 0.3:
+        params["tag"] = ctx.rng.choice(TAG_POOL)
+    elif roll < 0.4:
+        params["featured"] = "true"
+    return await ctx.client.get("/api/posts", params=params)
+
+async def get_post_anonymous(ctx: Context):
+    return await ctx.client.get(f"/api/posts/{ctx.slug()}")
+
+async def get_post_authenticated(ctx: Context):
+    return await ctx.client.get(f"/api/posts/{ctx.slug()}", headers=ctx.auth)
+
+async def search(ctx: Context):
+    return await ctx.client.get("/api/posts/search", params={"q": ctx.rng.choice(["ışık", "performans", "cay"])})
+
+async def create_post(ctx: Context):
+    response = await ctx.client.post("/api/posts", headers=ctx.auth, json={
+        "title": f"Yeni ölçüm {ctx.rng.random()}", "content": SEED_CONTENT,
+        "tags": ctx.rng.sample(TAG_POOL, 3),
+    })
+    if response.status_code == 201:
+        ctx.created.append(response.json()["slug"])
+    return response
+
+async def update_post(ctx: Context):
+    if not ctx.created:
+        return await create_post(ctx)
+    slug = ctx.rng.choice(ctx.created)
+    return await ctx.client.put(f"/api/posts/{slug}", headers=ctx.auth, json={
+        "content": SEED_CONTENT + f"\n\nGüncelleme {ctx.rng.random()}",
+    })
+
+async def login(ctx: Context):
+    return await ctx.client.post("/api/auth/login", json={"email": "demo@blog.com", "password": "demo123"})
+
+async def mixed(ctx: Context):
+    # ~90% reads (half of them authenticated), ~10% writes
+    roll = ctx.rng.random()
+    if roll < 0.35:
+        return await list_anonymous(ctx)
+    if roll < 0.60:
+        return await get_post_anonymous(ctx)
+    if roll < 0.85:
+        return await get_post_authenticated(ctx)
+    if roll < 0.90:
+        return await search(ctx)
+    if roll < 0.95:
+        return await create_post(ctx)
+    return await update_post(ctx)
+
+SCENARIOS = {
+    "list_anonymous": list_anonymous,
+    "get_post_anonymous": get_post_anonymous,
+    "get_post_authenticated": get_post_authenticated,
+    "search": search,
+    "create_post": create_post,
+    "update_post": update_post,
+    "login": login,
+    "mixed": mixed,
+}
+
+async def run_scenario(ctx: Context, scenario, requests: int, concurrency: int) -> dict:
+    samples: list[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await scenario(ctx)
+            samples.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stats = percentiles(samples)
+    return {
+        "rps": round(len(samples) / elapsed, 1),
+        "p50": stats["p50"], "p95": stats["p95"], "p99": stats["p99"],
+        "errors": errors,
+    }
+
+# ============ Baseline comparison ============
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Human-readable lines for every metric that regressed past the threshold."""
+    regressions = []
+    for size, scenarios in results["results"].items():
+        for name, metrics in scenarios.items():
+            before = baseline.get("results", {}).get(size, {}).get(name)
+            if not before:
+                continue
+            for metric in LATENCY_METRICS:
+                old, new = before.get(metric), metrics[metric]
+                if old and new > old * (1 + threshold):
+                    regressions.append(f"{size:>7} {name:<24} {metric:<4} {old:>10.3f} -> {new:>10.3f} ms  (+{(new / old - 1):.0%})")
+            old, new = before.get("rps"), metrics["rps"]
+            if old and new < old * (1 - threshold):
+                regressions.append(f"{size:>7} {name:<24} rps  {old:>10.1f} -> {new:>10.1f}     ({(new / old - 1):.0%})")
+    return regressions
+
+async def main(args) -> int:
+    from benchmarks.support import app_client
+    sizes = [int(size) for size in args.sizes.split(",")]
+    scenarios = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    results = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "bcrypt_rounds": args.bcrypt_rounds,
+        },
+        "results": {},
+    }
+    async with app_client() as client:
+        token = (await login(Context(client, "", 0))).json()["access_token"]
+        for size in sizes:
+            print(f"Growing archive to {size} posts...", file=sys.stderr)
+            ctx = Context(client, token, await grow_archive(size))
+            for name in scenarios:
+                await run_scenario(ctx, SCENARIOS[name], min(20, args.requests), args.concurrency)  # warm up
+                metrics = await run_scenario(ctx, SCENARIOS[name], args.requests, args.concurrency)
+                results["results"].setdefault(str(size), {})[name] = metrics
+                print(f"{size:>7} {name:<24} {metrics}", file=sys.stderr)
+
+    print(json.dumps(results, indent=2))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%} vs {args.baseline}:", file=sys.stderr)
+            print("\n".join(regressions), file=sys.stderr)
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%} vs {args.baseline}.", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--scenarios", help=f"comma separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--bcrypt-rounds", type=int, default=4,
+                        help="work factor used while benchmarking (login cost scales as 2^rounds)")
+    parser.add_argument("--save", help="write results JSON to this file")
+    parser.add_argument("--baseline", help="compare against a previously saved results file")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args()
+    # Measures the endpoints themselves; benchmarks.ratelimit covers the limiter
+    use_temp_database(bcrypt_rounds=str(args.bcrypt_rounds), rate_limit_enabled="false")
+    sys.exit(asyncio.run(main(args)))
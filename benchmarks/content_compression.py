@@ -0,0 +1,164 @@
+"""Post bodies stored as TEXT vs compressed with a trained zlib dictionary.
+
+    python -m benchmarks.content_compression [--posts 5000] [--requests 2000]
+                                             [--cache-kib 16000]
+
+Fills an archive with synthetic Markdown posts (a Zipf-distributed
+vocabulary, headings, lists and code, so they compress like prose and not
+like a repeated sentence), then measures it with CONTENT_COMPRESSION=off,
+runs `python -m app.compression --train --vacuum` and measures again:
+
+1. database and posts table size, and the stored body bytes;
+2. page cache hit rate of get_post's body query over a skewed (Zipf) mix
+   of posts, with --cache-kib of SQLite cache and mmap off. A miss is a
+   read() of the database file; the hit rate is 1 - reads / reads with a
+   minimal cache, which misses on nearly every page touched;
+3. GET /api/posts/{slug} latency with the response cache bypassed.
+
+Both runs serve byte-identical responses; the check is part of the output.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from benchmarks.support import percentiles, use_temp_database
+
+SYLLABLES = ["ka", "le", "mi", "ra", "sı", "tü", "ön", "ge", "li", "yor", "lar", "de", "ça", "şe", "ğı", "be", "ne", "ko"]
+
+def vocabulary(rng: random.Random, size: int = 4000) -> list[str]:
+    return ["".join(rng.choices(SYLLABLES, k=rng.randint(1, 4))) for _ in range(size)]
+
+def markdown(rng: random.Random, words: list[str], weights: list[float]) -> str:
+    def sentence() -> str:
+        text = " ".join(rng.choices(words, weights, k=rng.randint(6, 18)))
+        return text[0].upper() + text[1:] + rng.choice([".", ".", ".", "?", "!"])
+
+    parts = [f"# {sentence()[:-1]}", ""]
+    for section in range(rng.randint(3, 7)):
+        parts += [f"## {sentence()[:-1]}", ""]
+        for _ in range(rng.randint(2, 4)):
+            parts += [" ".join(sentence() for _ in range(rng.randint(3, 7))), ""]
+        if rng.random() < 0.5:
+            parts += [f"- **{rng.choice(words)}**: {sentence()}" for _ in range(rng.randint(2, 5))] + [""]
+        if rng.random() < 0.3:
+            name = rng.choice(words)
+            parts += ["```python", f"def {name}(items):", f"    return [item.{rng.choice(words)} for item in items]", "```", ""]
+        if rng.random() < 0.3:
+            parts += [f"Ayrıntılar için [{rng.choice(words)}](https://ornek.com/{rng.choice(words)}) bağlantısına bakın.", ""]
+    return "\n".join(parts)
+
+async def fill(count: int) -> list[str]:
+    from sqlalchemy import insert, select
+    from app.content import render_content
+    from app.database import async_session
+    from app.models import Post, User
+    rng = random.Random(count)
+    words = vocabulary(rng)
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    start = datetime.utcnow() - timedelta(days=count)
+    async with async_session() as db:
+        author_id = await db.scalar(select(User.id).where(User.email == "demo@blog.com"))
+        rows = []
+        for i in range(count):
+            content = markdown(rng, words, weights)
+            rendered = render_content(content)
+            rows.append({
+                "slug": f"govde-{i}", "title": f"Gövde {i}", "excerpt": rendered.excerpt,
+                "content": content, "content_html": rendered.html, "word_count": rendered.word_count,
+                "read_time": rendered.read_time, "author_id": author_id,
+                "created_at": start + timedelta(days=i), "updated_at": start + timedelta(days=i),
+            })
+        await db.execute(insert(Post), rows)
+        await db.commit()
+    return [row["slug"] for row in rows]
+
+def read_calls() -> int:
+    with open("/proc/self/io") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("syscr:"))
+
+def body_reads(path: str, slugs: list[str], cache_kib: int) -> int:
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA cache_size=-{cache_kib}")
+    conn.execute("PRAGMA mmap_size=0")
+    query = "SELECT content, content_html FROM posts WHERE slug = ?"
+    for slug in slugs[:len(slugs) // 4]:  # warm up
+        conn.execute(query, (slug,)).fetchone()
+    before = read_calls()
+    for slug in slugs:
+        conn.execute(query, (slug,)).fetchone()
+    reads = read_calls() - before
+    conn.close()
+    return reads
+
+async def measure(client, path: str, slugs: list[str], cache_kib: int) -> tuple[dict, dict]:
+    from app.compression import vacuum_database
+    from app.routers.posts import post_cache
+    await vacuum_database()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    table_bytes = conn.execute("SELECT sum(pgsize) FROM dbstat WHERE name = 'posts'").fetchone()[0]
+    body_bytes = conn.execute(
+        "SELECT sum(length(CAST(content AS BLOB)) + length(CAST(content_html AS BLOB))) FROM posts"
+    ).fetchone()[0]
+    conn.close()
+    reads = body_reads(path, slugs, cache_kib)
+    accesses = body_reads(path, slugs, 1)
+    latencies, bodies = [], {}
+    for slug in slugs:
+        post_cache._entries.clear()
+        started = time.perf_counter()
+        response = await client.get(f"/api/posts/{slug}")
+        latencies.append(time.perf_counter() - started)
+        bodies[slug] = response.content
+    return {
+        "database_bytes": os.path.getsize(path),
+        "posts_table_bytes": table_bytes,
+        "body_bytes": body_bytes,
+        "cache_hit_rate": round(1 - reads / max(accesses, 1), 3),
+        "get_post": percentiles(latencies),
+    }, bodies
+
+async def main(args) -> None:
+    data_dir = use_temp_database(content_compression="off", bcrypt_rounds="4")
+    path = os.path.join(data_dir, "blog.db")
+    from benchmarks.support import app_client
+    from app.compression import rewrite_bodies, store_dictionary
+    from app.config import get_settings
+    from app.database import async_session
+
+    async with app_client() as client:
+        posts = await fill(args.posts)
+        rng = random.Random(args.requests)
+        slugs = rng.choices(posts, [1 / (rank + 1) for rank in range(len(posts))], k=args.requests)
+        plain, plain_bodies = await measure(client, path, slugs, args.cache_kib)
+
+        get_settings().content_compression = "zlib"
+        started = time.perf_counter()
+        async with async_session() as db:
+            dictionary_id = await store_dictionary(db)
+            await rewrite_bodies(db)
+        backfill = time.perf_counter() - started
+        compressed, compressed_bodies = await measure(client, path, slugs, args.cache_kib)
+
+    print(json.dumps({
+        "posts": args.posts,
+        "requests": args.requests,
+        "cache_kib": args.cache_kib,
+        "off": plain,
+        "zlib": compressed,
+        "dictionary": dictionary_id,
+        "train_and_backfill_s": round(backfill, 2),
+        "size_ratio": round(plain["database_bytes"] / compressed["database_bytes"], 2),
+        "identical_responses": plain_bodies == compressed_bodies,
+    }, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--cache-kib", type=int, default=16000, help="SQLite page cache for the hit rate run")
+    asyncio.run(main(parser.parse_args()))
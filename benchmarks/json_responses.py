@@ -0,0 +1,78 @@
+"""FastAPI's response_model path vs app.responses for list and detail payloads.
+
+    python -m benchmarks.json_responses [--items 20] [--rounds 5000]
+
+Builds the models a handler would return (a page of PostListResponse and
+one PostResponse with a long body), checks that both paths produce the
+same bytes, then reports microseconds per response for:
+
+    fastapi  serialize_response() against the route's response_model
+             (re-validation + field.serialize) and JSONResponse.render()
+    fast     app.responses.json_bytes(): pydantic-core straight to bytes
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+def build(items: int) -> dict:
+    from app.schemas import PostListResponse, PostResponse, TagResponse, UserResponse
+    now = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    author = UserResponse(id=1, name="Demo Yazar", email="demo@blog.com", avatar=None, provider="email")
+    tags = [TagResponse(id=i, name=name) for i, name in enumerate(["Python", "FastAPI", "Çay"], 1)]
+    page = [
+        PostListResponse(
+            id=i, slug=f"yazi-{i}", title=f"Yazı {i}: “alıntı” ve ğüşiöç", excerpt="Kısa özet " * 8,
+            featured=i % 5 == 0, read_time="4 dk", created_at=now - timedelta(minutes=i),
+            author=author, tags=tags,
+        )
+        for i in range(1, items + 1)
+    ]
+    detail = PostResponse(
+        id=1, slug="yazi-1", title="Yazı 1", excerpt="Kısa özet", content="Uzun içerik paragrafı. " * 400,
+        content_html="<p>" + "Uzun içerik paragrafı. " * 400 + "</p>", word_count=1200, featured=True,
+        read_time="6 dk", created_at=now, updated_at=now, author=author, tags=tags,
+    )
+    return {"list": (list[PostListResponse], page), "detail": (PostResponse, detail)}
+
+def fastapi_path(response_model):
+    import asyncio
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+    field = create_model_field(name="Response", type_=response_model, mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def render(content) -> bytes:
+        return JSONResponse(loop.run_until_complete(serialize_response(field=field, response_content=content))).body
+    return render
+
+def per_call_us(render, content, rounds: int) -> float:
+    render(content)  # warm up
+    started = time.perf_counter()
+    for _ in range(rounds):
+        render(content)
+    return round((time.perf_counter() - started) / rounds * 1e6, 2)
+
+def main(args) -> None:
+    from app.responses import json_bytes
+    results = {}
+    for name, (response_model, content) in build(args.items).items():
+        default = fastapi_path(response_model)
+        if default(content) != json_bytes(content):
+            raise SystemExit(f"{name}: output differs between the two paths")
+        fastapi_us = per_call_us(default, content, args.rounds)
+        fast_us = per_call_us(json_bytes, content, args.rounds)
+        results[name] = {
+            "bytes": len(json_bytes(content)),
+            "fastapi_us": fastapi_us,
+            "fast_us": fast_us,
+            "speedup": round(fastapi_us / fast_us, 1),
+        }
+    print(json.dumps({"items": args.items, "rounds": args.rounds, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5000)
+    main(parser.parse_args())
@@ -0,0 +1,99 @@
+"""ORM hydration vs the projection path for one page of GET /api/posts.
+
+    python -m benchmarks.list_projection [--posts 5000] [--limit 100] [--rounds 50]
+
+Seeds posts with long bodies and several tags each, checks that both paths
+produce identical bytes, then reports wall time and tracemalloc peak per
+page for each.
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from benchmarks.support import use_temp_database
+
+async def orm_page(db, limit: int) -> bytes:
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+    from app.models import Post
+    from app.schemas import PostListResponse
+    result = await db.execute(
+        select(Post).options(selectinload(Post.author), selectinload(Post.tags))
+        .order_by(Post.created_at.desc(), Post.id.desc()).limit(limit + 1)
+    )
+    posts = result.scalars().all()[:limit]
+    return TypeAdapter(list[PostListResponse]).dump_json([PostListResponse.model_validate(p) for p in posts])
+
+async def projection_page(db, limit: int) -> bytes:
+    from app.listing import list_post_page
+    body, _ = await list_post_page(db, limit=limit)
+    return body
+
+async def seed(count: int) -> None:
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert
+    from app.database import async_session, init_db
+    from app.models import Post, Tag, User, post_tags
+    await init_db()
+    now = datetime.utcnow()
+    async with async_session() as db:
+        await db.execute(insert(User).values(id=1, email="b@blog.com", name="Bench Yazar", hashed_password=""))
+        await db.execute(insert(Tag), [{"id": i, "name": f"etiket-{i}"} for i in range(1, 51)])
+        await db.execute(insert(Post), [
+            {"id": i, "slug": f"yazi-{i}", "title": f"Yazı {i}", "excerpt": "Kısa özet " * 8,
+             "content": "Uzun içerik paragrafı. " * 400, "featured": i % 10 == 0, "read_time": "9 dk",
+             "author_id": 1, "created_at": now - timedelta(minutes=i), "updated_at": now}
+            for i in range(1, count + 1)
+        ])
+        await db.execute(insert(post_tags), [
+            {"post_id": i, "tag_id": tag_id}
+            for i in range(1, count + 1) for tag_id in {(i * k) % 50 + 1 for k in (1, 7, 13)}
+        ])
+        await db.commit()
+
+async def measure(fn, limit: int, rounds: int) -> dict:
+    from app.database import async_session
+    async with async_session() as db:
+        await fn(db, limit)  # warm up
+        started = time.perf_counter()
+        for _ in range(rounds):
+            async with async_session() as fresh:
+                await fn(fresh, limit)
+        elapsed = (time.perf_counter() - started) / rounds
+        tracemalloc.start()
+        async with async_session() as fresh:
+            await fn(fresh, limit)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"ms_per_page": round(elapsed * 1000, 3), "peak_kib": round(peak / 1024, 1)}
+
+async def main(args) -> None:
+    from app.database import async_session
+    await seed(args.posts)
+    async with async_session() as db:
+        orm_body = await orm_page(db, args.limit)
+    async with async_session() as db:
+        projection_body = await projection_page(db, args.limit)
+    assert orm_body == projection_body, "projection output differs from PostListResponse"
+
+    orm = await measure(orm_page, args.limit, args.rounds)
+    projection = await measure(projection_page, args.limit, args.rounds)
+    print(json.dumps({
+        "posts": args.posts,
+        "page_size": args.limit,
+        "orm": orm,
+        "projection": projection,
+        "speedup": round(orm["ms_per_page"] / projection["ms_per_page"], 2),
+        "memory_ratio": round(orm["peak_kib"] / projection["peak_kib"], 2),
+    }, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    use_temp_database()
+    asyncio.run(main(args))
@@ -0,0 +1,73 @@
+"""Read latency on one worker while it handles a burst of logins.
+
+    python -m benchmarks.login_storm [--logins 200] [--concurrency 50] [--readers 4]
+
+Measures GET /api/posts/{slug} latency first on an idle app and then while
+`--logins` bcrypt verifications are in flight. With hashing on the bounded
+executor the two distributions should be close; with bcrypt on the event
+loop the storm phase would show p99 in the hundreds of milliseconds.
+"""
+import argparse
+import asyncio
+import json
+import time
+from benchmarks.support import app_client, percentiles, use_temp_database
+
+async def read_loop(client, stop: asyncio.Event, samples: list[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/api/posts/tasarimda-minimalizm")
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.text
+
+async def measure_reads(client, readers: int, seconds: float) -> list[float]:
+    samples: list[float] = []
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(read_loop(client, stop, samples)) for _ in range(readers)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return samples
+
+async def login_storm(client, logins: int, concurrency: int) -> dict:
+    gate = asyncio.Semaphore(concurrency)
+    statuses: dict[int, int] = {}
+
+    async def one() -> None:
+        async with gate:
+            response = await client.post(
+                "/api/auth/login", json={"email": "demo@blog.com", "password": "demo123"}
+            )
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    return {"seconds": round(time.perf_counter() - started, 3), "statuses": statuses}
+
+async def main(args) -> None:
+    async with app_client() as client:
+        await client.get("/api/posts/tasarimda-minimalizm")  # warm the cache
+        idle = await measure_reads(client, args.readers, args.idle_seconds)
+
+        samples: list[float] = []
+        stop = asyncio.Event()
+        readers = [asyncio.create_task(read_loop(client, stop, samples)) for _ in range(args.readers)]
+        storm = await login_storm(client, args.logins, args.concurrency)
+        stop.set()
+        await asyncio.gather(*readers)
+
+    print(json.dumps({
+        "reads_idle_ms": percentiles(idle),
+        "reads_during_storm_ms": percentiles(samples),
+        "logins": storm,
+    }, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--idle-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+    use_temp_database(rate_limit_enabled="false")  # the storm is the point
+    asyncio.run(main(args))
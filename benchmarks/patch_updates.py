@@ -0,0 +1,70 @@
+"""Editor autosave on a long post: PUT with the whole body vs PATCH with edits.
+
+    python -m benchmarks.patch_updates [--kib 200] [--saves 200]
+
+Each save types a short sentence somewhere in the post. PUT uploads the
+full new content and downloads the full PostResponse; PATCH uploads the
+splice against the last version and gets the new version back. Reports
+bytes per save in each direction and latency.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from benchmarks.support import percentiles, use_temp_database
+
+PARAGRAPH = "Şehirdeki ışıklar, ağaçların gölgesi ve çay bahçesindeki sohbetler üzerine bir paragraf. "
+
+async def autosave(client, auth: dict, slug: str, content: str, saves: int, patch: bool) -> dict:
+    rng = random.Random(saves)
+    version = (await client.get(f"/api/posts/{slug}")).json()["version"]
+    sent, received, latencies = 0, 0, []
+    for i in range(saves):
+        at = content.rfind(" ", 0, rng.randint(1, len(content) - 1)) + 1
+        typed = f"Kaydedilen cümle {i}. "
+        content = content[:at] + typed + content[at:]
+        if patch:
+            body = {"base_version": version, "edits": [{"start": at, "end": at, "text": typed}]}
+        else:
+            body = {"content": content}
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        started = time.perf_counter()
+        response = await client.request("PATCH" if patch else "PUT", f"/api/posts/{slug}", headers={
+            **auth, "Content-Type": "application/json",
+        }, content=payload)
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise SystemExit(f"{response.request.method}: {response.status_code} {response.text}")
+        version = response.json()["version"]
+        sent += len(payload)
+        received += len(response.content)
+    saved = (await client.get(f"/api/posts/{slug}")).json()["content"]
+    if saved != content:
+        raise SystemExit("saved content differs from the editor's")
+    return {
+        "request_bytes_per_save": sent // saves,
+        "response_bytes_per_save": received // saves,
+        "latency": percentiles(latencies),
+    }
+
+async def main(args) -> None:
+    use_temp_database(bcrypt_rounds="4", rate_limit_enabled="false")
+    from benchmarks.support import app_client
+    content = "# Uzun yazı\n\n" + "\n\n".join(
+        PARAGRAPH * 4 for _ in range(args.kib * 1024 // (len(PARAGRAPH.encode("utf-8")) * 4))
+    )
+    async with app_client() as client:
+        login = await client.post("/api/auth/login", json={"email": "demo@blog.com", "password": "demo123"})
+        auth = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        results = {"content_bytes": len(content.encode("utf-8")), "saves": args.saves}
+        for method, patch in (("put", False), ("patch", True)):
+            created = await client.post("/api/posts", headers=auth, json={"title": f"Uzun yazı {method}", "content": content})
+            results[method] = await autosave(client, auth, created.json()["slug"], content, args.saves, patch)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kib", type=int, default=200, help="size of the post being edited")
+    parser.add_argument("--saves", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
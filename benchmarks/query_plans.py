@@ -0,0 +1,157 @@
+"""EXPLAIN QUERY PLAN check for every statement the routers issue.
+
+    python -m benchmarks.query_plans [--posts 3000] [--verbose]
+
+Drives each endpoint in-process against a throwaway archive, records every
+SQL statement the three engines run, and explains each one with the
+parameters it ran with. A statement fails the check when its plan scans a
+whole table or index (SCAN without a SEARCH key) or sorts through a temp B-tree for ORDER BY, unless it is
+listed in ALLOWED with the reason it has to, or when it matches REQUIRED
+and its plan lacks the line given there. Exits 1 on failures, so it can
+guard index changes in CI.
+"""
+import argparse
+import asyncio
+import json
+import re
+import sys
+from benchmarks.support import use_temp_database
+
+# (statement pattern, plan line pattern, why the plan is unavoidable)
+ALLOWED = [
+    (r"posts_fts MATCH", r"TEMP B-TREE FOR ORDER BY", "search results are ordered by bm25 rank, computed per query"),
+    (r"FROM posts JOIN users ON users.id = posts.author_id ORDER BY posts.created_at, posts.id$",
+     r"^SCAN posts USING INDEX ix_posts_created_at_id_updated_at$", "export streams every post"),
+    (r"^SELECT .* FROM posts( JOIN users ON users.id = posts.author_id)? ORDER BY posts.created_at DESC, posts.id DESC LIMIT",
+     r"^SCAN posts USING (COVERING )?INDEX ix_posts_created_at_id_updated_at$",
+     "a first page walks the keyset index from the newest post and stops at LIMIT"),
+    (r"sum\(CASE", r"TEMP B-TREE FOR ORDER BY", "related candidates are ordered by their computed score"),
+    (r"row_number\(\) OVER", r"TEMP B-TREE FOR RIGHT PART OF ORDER BY", "trimming neighbour lists ranks a handful of rows per post"),
+]
+# (statement pattern, plan line pattern it must contain, why)
+REQUIRED = [
+    (r"INDEXED BY ix_posts_slug_updated_at", r"USING COVERING INDEX ix_posts_slug_updated_at",
+     "a conditional GET's validator must not read the post row and its bodies"),
+]
+# Tables only: SCAN of a subquery (anon_1, (subquery-2)) reads rows already
+# narrowed. SCAN ... USING [COVERING] INDEX still reads the whole index.
+FULL_SCAN = re.compile(r"^SCAN (?!anon_|\(subquery)(?!.*VIRTUAL TABLE)")
+SORT = re.compile(r"USE TEMP B-TREE FOR (ORDER BY|RIGHT PART OF ORDER BY|LAST TERM OF ORDER BY)")
+SKIP = re.compile(r"^\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|PRAGMA)", re.I)
+
+def record_statements(engines) -> dict[str, tuple]:
+    from sqlalchemy import event
+    seen: dict[str, tuple] = {}
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        if SKIP.match(statement) or statement.startswith("EXPLAIN") or statement in seen:
+            return
+        seen[statement] = parameters[0] if executemany else parameters
+
+    for engine in engines:
+        event.listen(engine.sync_engine, "before_cursor_execute", before)
+    return seen
+
+async def tour(client) -> None:
+    """One request per endpoint and variant the routers serve."""
+    async def ok(response, *codes):
+        if response.status_code not in (codes or (200,)):
+            raise SystemExit(f"{response.request.method} {response.request.url}: {response.status_code} {response.text}")
+        return response
+
+    login = await ok(await client.post("/api/auth/login", json={"email": "demo@blog.com", "password": "demo123"}))
+    auth = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    await ok(await client.get("/api/auth/me", headers=auth))
+    await ok(await client.post("/api/auth/register", json={"name": "Plan", "email": "plan@blog.com", "password": "plan123"}))
+    await ok(await client.post("/api/auth/oauth-demo", json={"provider": "google", "email": "o@blog.com", "name": "O"}))
+
+    page = await ok(await client.get("/api/posts"))
+    await ok(await client.get("/api/posts", params={"cursor": page.headers["x-next-cursor"]}))
+    await ok(await client.get("/api/posts", params={"featured": "true"}))
+    tagged = await ok(await client.get("/api/posts", params={"tag": "etiket-1", "limit": 5}))
+    await ok(await client.get("/api/posts", params={"tag": "etiket-1", "cursor": tagged.headers["x-next-cursor"]}))
+    await ok(await client.get("/api/posts", params={"tag": "etiket-1", "featured": "true"}))
+    slug = page.json()[0]["slug"]
+    await ok(await client.get(f"/api/posts/{slug}/related"))
+    await ok(await client.get("/api/posts/search", params={"q": "ölçüm"}))
+    await ok(await client.get("/api/tags"))
+    await ok(await client.get("/api/tags", params={"featured": "true", "limit": 5}))
+
+    created = await ok(await client.post("/api/posts", headers=auth, json={
+        "title": "Plan yazısı", "content": "# Plan\n\nMetin", "tags": ["etiket-1", "etiket-2"],
+    }), 201)
+    slug = created.json()["slug"]
+    updated = await ok(await client.put(f"/api/posts/{slug}", headers=auth, json={"content": "Yeni metin", "tags": ["etiket-3"]}))
+    await ok(await client.patch(f"/api/posts/{slug}", headers=auth, json={
+        "base_version": updated.json()["version"], "edits": [{"start": 0, "end": 0, "text": "Daha "}],
+    }))
+    # Uncached conditional requests: the validator queries alone
+    from app.routers.posts import post_cache
+    post_cache._entries.clear()
+    detail = await ok(await client.get(f"/api/posts/{slug}"))
+    listing = await ok(await client.get("/api/posts"))
+    post_cache._entries.clear()
+    await ok(await client.get(f"/api/posts/{slug}", headers={"If-None-Match": detail.headers["etag"]}), 304)
+    await ok(await client.get("/api/posts", headers={"If-None-Match": listing.headers["etag"]}), 304)
+
+    export = await ok(await client.get("/api/posts/export", headers=auth))
+    first_line = export.content.split(b"\n", 1)[0]
+    await ok(await client.post("/api/posts/import", headers=auth, content=first_line))
+    await ok(await client.delete(f"/api/posts/{slug}", headers=auth), 204)
+    # Whatever derived work the worker has not reached yet (app.jobs)
+    from app.jobs import run_due_jobs
+    await run_due_jobs()
+
+def explain(sync_conn, statement: str, parameters) -> list[str]:
+    return [row[3] for row in sync_conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+
+def problems(statement: str, plan: list[str]) -> list[str]:
+    statement = " ".join(statement.split())  # patterns match single-spaced SQL
+    found = []
+    for line in plan:
+        if not (FULL_SCAN.search(line) or SORT.search(line)):
+            continue
+        if any(re.search(sql, statement) and re.search(plan_line, line) for sql, plan_line, _ in ALLOWED):
+            continue
+        found.append(line)
+    for sql, plan_line, _ in REQUIRED:
+        if re.search(sql, statement) and not any(re.search(plan_line, line) for line in plan):
+            found.append(f"missing: {plan_line}")
+    return found
+
+async def main(args) -> int:
+    use_temp_database(bcrypt_rounds="4", rate_limit_enabled="false")
+    from benchmarks.api import grow_archive
+    from benchmarks.support import app_client
+    from app.database import engine, read_engine, write_engine
+
+    async with app_client() as client:
+        await grow_archive(args.posts)
+        statements = record_statements({engine, write_engine, read_engine})
+        await tour(client)
+        recorded = dict(statements)
+        statements.clear()
+        async with engine.connect() as conn:
+            plans = {
+                statement: await conn.run_sync(explain, statement, parameters)
+                for statement, parameters in recorded.items()
+            }
+
+    failures = 0
+    for statement, plan in plans.items():
+        found = problems(statement, plan)
+        failures += bool(found)
+        if found or args.verbose:
+            print(("FAIL " if found else "ok   ") + " ".join(statement.split()), file=sys.stderr)
+            for line in plan:
+                print(f"       {'!' if line in found else ' '} {line}", file=sys.stderr)
+            for line in set(found) - set(plan):
+                print(f"       ! {line}", file=sys.stderr)
+    print(json.dumps({"statements": len(plans), "failures": failures}))
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=3000)
+    parser.add_argument("--verbose", action="store_true", help="print every plan, not only failures")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,59 @@
+"""Cost of the shared login rate limiter.
+
+    python -m benchmarks.ratelimit [--calls 100000] [--processes 4]
+
+1. TokenBuckets.take() per call in one process and with --processes
+   processes hammering the same file at once (the flock is shared).
+2. POST /api/auth/login end to end: an allowed login (bcrypt included)
+   next to a rejected one, which answers 429 before any hashing.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from benchmarks.support import percentiles, use_temp_database
+
+def hammer(path: str, calls: int, worker: int) -> float:
+    from app.ratelimit import Rate, TokenBuckets
+    buckets = TokenBuckets(path)
+    rate = Rate(burst=20, per_second=10 / 60)
+    started = time.perf_counter()
+    for i in range(calls):
+        buckets.take([(f"auth:ip:10.{worker}.{i % 256}.{i // 256 % 256}", rate), (f"auth:email:u{i}@x.com", rate)])
+    return (time.perf_counter() - started) / calls
+
+def _hammer(args: tuple) -> float:
+    return hammer(*args)
+
+async def endpoint(logins: int) -> dict:
+    from benchmarks.support import app_client
+    allowed, rejected = [], []
+    async with app_client() as client:
+        # The first RATE_LIMIT_EMAIL_BURST attempts hash; the rest are refused
+        for _ in range(logins):
+            started = time.perf_counter()
+            response = await client.post("/api/auth/login", json={"email": "demo@blog.com", "password": "demo123"})
+            (rejected if response.status_code == 429 else allowed).append(time.perf_counter() - started)
+    return {"allowed": percentiles(allowed), "rejected_429": percentiles(rejected)}
+
+def main(args) -> None:
+    data_dir = use_temp_database(rate_limit_email_burst="5")
+    path = os.path.join(data_dir, "bench.buckets")
+    single = hammer(path, args.calls, 0)
+    with multiprocessing.Pool(args.processes) as pool:
+        shared = pool.map(_hammer, [(path, args.calls // args.processes, w + 1) for w in range(args.processes)])
+    results = {
+        "take_us_single_process": round(single * 1e6, 2),
+        f"take_us_{args.processes}_processes": round(max(shared) * 1e6, 2),
+        "login": asyncio.run(endpoint(args.logins)),
+    }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--logins", type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,98 @@
+"""Reader latency and lock errors while writers commit, per engine profile.
+
+    python -m benchmarks.sqlite_concurrency [--seconds 5] [--readers 8] [--writers 2]
+
+Runs the same mixed workload twice against a fresh database file: once with
+SQLite's defaults (rollback journal, no busy timeout) and once with the
+engine profile from app.database. Readers run list-style queries while
+writers insert and commit posts in short transactions. With WAL, readers
+never wait for a writer, so reader p99 stays flat and "database is locked"
+errors disappear.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from sqlalchemy import insert, select, text
+from sqlalchemy.exc import OperationalError
+from benchmarks.support import percentiles
+
+async def run_profile(name: str, overrides: dict, args) -> dict:
+    from app.config import Settings
+    from app.database import Base, make_engine
+    from app.models import Post, User
+
+    path = os.path.join(tempfile.mkdtemp(prefix="blog-bench-"), "blog.db")
+    settings = Settings(database_url=f"sqlite+aiosqlite:///{path}", **overrides)
+    engine = make_engine(settings)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User).values(email="w@blog.com", name="Writer", hashed_password=""))
+        await conn.execute(insert(Post), [
+            {"slug": f"seed-{i}", "title": f"Seed {i}", "content": "x " * 500, "author_id": 1,
+             "created_at": datetime.utcnow(), "updated_at": datetime.utcnow()}
+            for i in range(2000)
+        ])
+
+    stop = time.perf_counter() + args.seconds
+    read_samples: list[float] = []
+    errors = {"read": 0, "write": 0}
+    writes = 0
+
+    async def reader() -> None:
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(
+                        select(Post.id, Post.title).order_by(Post.created_at.desc()).limit(20)
+                    )
+                    await conn.execute(text("SELECT count(*) FROM posts"))
+                read_samples.append(time.perf_counter() - started)
+            except OperationalError:
+                errors["read"] += 1
+
+    async def writer(worker: int) -> None:
+        nonlocal writes
+        n = 0
+        while time.perf_counter() < stop:
+            n += 1
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(insert(Post).values(
+                        slug=f"w{worker}-{n}", title="Write", content="y " * 2000, author_id=1,
+                        created_at=datetime.utcnow(), updated_at=datetime.utcnow(),
+                    ))
+                writes += 1
+            except OperationalError:
+                errors["write"] += 1
+
+    await asyncio.gather(*(reader() for _ in range(args.readers)), *(writer(i) for i in range(args.writers)))
+    await engine.dispose()
+    return {
+        "profile": name,
+        "reads_ms": percentiles(read_samples),
+        "writes_per_second": round(writes / args.seconds, 1),
+        "errors": errors,
+    }
+
+async def main(args) -> None:
+    rollback = {
+        "sqlite_journal_mode": "delete", "sqlite_synchronous": "full", "sqlite_busy_timeout_ms": 0,
+        "sqlite_mmap_size": 0, "sqlite_cache_size": -2000, "sqlite_temp_store": "default",
+    }
+    results = [
+        await run_profile("rollback-journal", rollback, args),
+        await run_profile("engine-profile", {}, args),
+    ]
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    asyncio.run(main(parser.parse_args()))
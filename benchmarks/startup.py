@@ -0,0 +1,115 @@
+"""Time until a gunicorn fleet serves requests, per STARTUP_MODE.
+
+    python -m benchmarks.startup [--workers 9] [--runs 3]
+
+Starts gunicorn with uvicorn workers against a fresh database (cold) and
+again against the database the cold start left behind (warm), for:
+
+    worker   every worker runs init_db + seed in its lifespan
+    lock     the first worker bootstraps under a file lock, the rest skip
+    preload  gunicorn.conf.py's on_starting hook bootstraps before forking,
+             workers run with STARTUP_MODE=skip
+
+Reports the time to the first successful /api/health and the time until
+every worker has logged "Application startup complete"; null means that
+never happened within --timeout (in worker mode a cold start can crash
+workers that race each other to seed).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+MODES = {
+    "worker": ("worker", False),
+    "lock": ("lock", False),
+    "preload": ("skip", True),
+}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_fleet(mode: str, data_dir: str, workers: int, timeout: float) -> dict:
+    startup_mode, use_hook = MODES[mode]
+    port = free_port()
+    # An empty config file keeps gunicorn.conf.py's on_starting hook out of the other modes
+    config = "gunicorn.conf.py" if use_hook else os.devnull
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite+aiosqlite:///{data_dir}/blog.db",
+        STARTUP_MODE=startup_mode,
+        BCRYPT_ROUNDS="12",
+    )
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", config, "app.main:app",
+         "-k", "uvicorn.workers.UvicornWorker", "-w", str(workers),
+         "-b", f"127.0.0.1:{port}", "--log-level", "info"],
+        env=env, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True,
+    )
+    ready = []
+    all_ready = threading.Event()
+
+    def watch_log() -> None:
+        for line in process.stderr:
+            if "Application startup complete" in line:
+                ready.append(time.perf_counter() - started)
+                if len(ready) == workers:
+                    all_ready.set()
+
+    threading.Thread(target=watch_log, daemon=True).start()
+    first_response = None
+    try:
+        while first_response is None and time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1) as response:
+                    if response.status == 200:
+                        first_response = time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        all_ready.wait(max(0.0, timeout - (time.perf_counter() - started)))
+    finally:
+        process.terminate()
+        process.wait()
+    return {
+        "first_request_s": round(first_response, 3) if first_response else None,
+        "fleet_ready_s": round(ready[-1], 3) if len(ready) == workers else None,
+    }
+
+def main(args) -> None:
+    results = {}
+    for mode in args.modes.split(","):
+        cold, warm = [], []
+        for _ in range(args.runs):
+            data_dir = tempfile.mkdtemp(prefix="blog-bench-")
+            cold.append(start_fleet(mode, data_dir, args.workers, args.timeout))
+            warm.append(start_fleet(mode, data_dir, args.workers, args.timeout))
+
+        def median(runs: list[dict], key: str):
+            values = [run[key] for run in runs if run[key] is not None]
+            return round(statistics.median(values), 3) if len(values) == len(runs) else None
+
+        results[mode] = {
+            start: {key: median(runs, key) for key in ("first_request_s", "fleet_ready_s")}
+            for start, runs in (("cold", cold), ("warm", warm))
+        }
+        print(f"{mode:<8} {results[mode]}", file=sys.stderr)
+    print(json.dumps({"workers": args.workers, "runs": args.runs, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count() * 2 + 1)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--timeout", type=float, default=60.0)
+    main(parser.parse_args())
@@ -0,0 +1,43 @@
+"""Helpers for driving the app in-process against a throwaway database.
+
+Call use_temp_database() before anything imports app.*, since settings and
+the engine are created at import time.
+"""
+import os
+import statistics
+import tempfile
+from contextlib import asynccontextmanager
+
+def use_temp_database(**env: str) -> str:
+    """Point the app at a fresh SQLite file in a temp dir; returns the dir."""
+    data_dir = tempfile.mkdtemp(prefix="blog-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{data_dir}/blog.db"
+    for key, value in env.items():
+        os.environ[key.upper()] = value
+    return data_dir
+
+@asynccontextmanager
+async def app_client():
+    """Run the app lifespan (schema + seed) and yield an httpx client bound to it."""
+    import httpx
+    from app.main import app, lifespan
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
+
+def percentiles(samples: list[float]) -> dict:
+    """p50/p95/p99/max of latency samples (seconds) reported in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered) * 1000, 3),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(ordered[-1] * 1000, 3),
+    }
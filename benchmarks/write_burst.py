@@ -0,0 +1,66 @@
+"""Write throughput under concurrent authoring, with group-commit batch sizes.
+
+    python -m benchmarks.write_burst [--requests 256] [--concurrency 1,4,16,64]
+
+Sends bursts of POST /api/posts at increasing concurrency through the app
+in-process and reports requests/s, latency percentiles and how many
+operations app.writer committed per transaction. With the single writer,
+throughput should hold or rise with concurrency while batches grow,
+instead of collapsing into lock waits.
+"""
+import argparse
+import asyncio
+import json
+import time
+from benchmarks.support import percentiles, use_temp_database
+
+async def main(args) -> None:
+    from benchmarks.support import app_client
+    from app.writer import WriteQueue
+
+    batch_sizes: list[int] = []
+    commit_batch = WriteQueue._commit_batch
+
+    async def recording_commit_batch(self, batch):
+        batch_sizes.append(len(batch))
+        return await commit_batch(self, batch)
+
+    WriteQueue._commit_batch = recording_commit_batch
+    results = {}
+    async with app_client() as client:
+        response = await client.post("/api/auth/login", json={"email": "demo@blog.com", "password": "demo123"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        for concurrency in map(int, args.concurrency.split(",")):
+            batch_sizes.clear()
+            samples, errors = [], 0
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def create(i: int) -> None:
+                nonlocal errors
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post("/api/posts", headers=headers, json={
+                        "title": f"Patlama {concurrency} {i}", "content": "Kısa bir içerik.", "tags": ["Yük", f"t{i % 8}"],
+                    })
+                    samples.append(time.perf_counter() - started)
+                    errors += response.status_code != 201
+
+            started = time.perf_counter()
+            await asyncio.gather(*(create(i) for i in range(args.requests)))
+            elapsed = time.perf_counter() - started
+            results[concurrency] = {
+                "rps": round(args.requests / elapsed, 1),
+                "errors": errors,
+                "commits": len(batch_sizes),
+                "max_batch": max(batch_sizes, default=0),
+                **percentiles(samples),
+            }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", default="1,4,16,64")
+    args = parser.parse_args()
+    use_temp_database(bcrypt_rounds="4")
+    asyncio.run(main(args))
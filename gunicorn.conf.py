@@ -13,6 +13,9 @@ worker_connections = 1000
 timeout = 30
 keepalive = 2
 
+# Proxies whose X-Forwarded-For/-Proto uvicorn trusts (comma-separated IPs)
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
 # Logging
 accesslog = "-"
 errorlog = "-"
@@ -29,6 +32,19 @@ user = None
 group = None
 tmp_upload_dir = None
 
+# Server hooks
+def on_starting(server):
+    """Create the schema and seed once, before any worker is forked.
+
+    Runs in a subprocess so the master never opens database connections
+    that the forked workers would inherit.
+    """
+    import subprocess
+    import sys
+    from app.config import get_settings
+    if get_settings().startup_mode != "worker":
+        subprocess.run([sys.executable, "-m", "app.bootstrap"], check=True)
+
 # SSL (uncomment for HTTPS)
 # keyfile = "/path/to/key.pem"
 # certfile = "/path/to/cert.pem"
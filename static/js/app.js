@@ -11,6 +11,10 @@ const state = {
     token: localStorage.getItem('blog-token') || null,
     theme: localStorage.getItem('blog-theme') || 'light',
     posts: [],
+    nextCursor: null,
+    featuredPost: null,
+    tags: [],
+    activeTag: null,
     currentPost: null,
     isOfflineMode: false // Will be set on init
 };
@@ -189,6 +193,19 @@ async function api(endpoint, options = {}) {
     return data;
 }
 
+// One page of a cursor-paged listing; next is the X-Next-Cursor to pass for the following page
+async function apiPage(endpoint, params = {}) {
+    if (state.isOfflineMode) {
+        const items = await offlineApi(endpoint);
+        return { items: params.tag ? items.filter(p => p.tags.some(t => t.name === params.tag)) : items, next: null };
+    }
+    
+    const query = new URLSearchParams(Object.entries(params).filter(([, v]) => v != null));
+    const res = await fetch(`${API_BASE}${endpoint}?${query}`);
+    if (!res.ok) throw new Error('Bir hata oluştu');
+    return { items: await res.json(), next: res.headers.get('X-Next-Cursor') };
+}
+
 // ============ Offline API Simulation ============
 async function offlineApi(endpoint, options = {}) {
     const method = options.method || 'GET';
@@ -249,6 +266,14 @@ async function offlineApi(endpoint, options = {}) {
         return getOfflinePosts();
     }
     
+    if (endpoint.startsWith('/tags') && method === 'GET') {
+        const counts = {};
+        getOfflinePosts().forEach(p => p.tags.forEach(t => { counts[t.name] = (counts[t.name] || 0) + 1; }));
+        return Object.entries(counts)
+            .sort((a, b) => b[1] - a[1] || a[0].localeCompare(b[0], 'tr'))
+            .map(([name, post_count], i) => ({ id: i + 1, name, post_count }));
+    }
+    
     if (endpoint === '/posts' && method === 'POST') {
         if (!state.user) throw new Error('Giriş yapmanız gerekiyor');
         const posts = getOfflinePosts();
@@ -677,6 +702,25 @@ function OAuthButtons() {
     `;
 }
 
+function TagChips() {
+    if (!state.tags.length) return '';
+    const chip = (name, label) => `<button class="tag${state.activeTag === name ? ' active' : ''}" onclick='filterByTag(${JSON.stringify(name).replace(/'/g, '&#39;')})'>${label}</button>`;
+    return `
+        <div class="tags tag-filter animate-fade-in">
+            ${chip(null, 'Tümü')}
+            ${state.tags.map(t => chip(t.name, t.name)).join('')}
+        </div>
+    `;
+}
+
+function LoadMore() {
+    return state.nextCursor ? `
+        <div class="load-more">
+            <button class="btn btn-ghost" id="loadMore" onclick="loadMorePosts()">Daha fazla</button>
+        </div>
+    ` : '';
+}
+
 function PostCard(post, index = 0) {
     const date = new Date(post.created_at).toLocaleDateString('tr-TR', { day: 'numeric', month: 'long', year: 'numeric' });
     return `
@@ -701,8 +745,8 @@ function PostCard(post, index = 0) {
 
 // ============ Pages ============
 function HomePage() {
-    const featured = state.posts.find(p => p.featured);
-    const others = state.posts.filter(p => !p.featured);
+    const featured = state.featuredPost;
+    const others = state.posts.filter(p => p.slug !== featured?.slug);
     
     return `
         ${Navbar()}
@@ -738,6 +782,7 @@ function HomePage() {
                     <div class="posts-grid">
                         ${others.map((p, i) => PostCard(p, i)).join('')}
                     </div>
+                    ${LoadMore()}
                 </div>
             </section>
         </main>
@@ -755,9 +800,11 @@ function BlogPage() {
                         <h1 style="font-size: clamp(2rem, 5vw, 3rem); font-weight: 700; letter-spacing: -0.03em; margin-bottom: 1rem;">Tüm Yazılar</h1>
                         <p style="font-size: 1.125rem; color: var(--text-muted);">Frontend, tasarım ve teknoloji üzerine düşünceler</p>
                     </div>
+                    ${TagChips()}
                     <div class="posts-grid">
                         ${state.posts.map((p, i) => PostCard(p, i)).join('')}
                     </div>
+                    ${LoadMore()}
                 </div>
             </section>
         </main>
@@ -772,9 +819,10 @@ function PostPage(slug) {
     const date = new Date(post.created_at).toLocaleDateString('tr-TR', { day: 'numeric', month: 'long', year: 'numeric' });
     const isAuthor = state.user && state.user.id === post.author.id;
     
-    // Check if content is HTML or markdown
+    // The server renders and sanitizes content at write time; only
+    // offline-mode posts (localStorage) still need the fallback below.
     const isHtml = post.content.startsWith('<') || post.content.includes('</');
-    const content = isHtml ? post.content : post.content
+    const content = post.content_html ?? (isHtml ? post.content : post.content
         .replace(/^### (.*$)/gim, '<h3>$1</h3>')
         .replace(/^## (.*$)/gim, '<h2>$1</h2>')
         .replace(/^# (.*$)/gim, '<h1>$1</h1>')
@@ -782,7 +830,7 @@ function PostPage(slug) {
         .replace(/\*(.*?)\*/g, '<em>$1</em>')
         .replace(/`([^`]+)`/g, '<code>$1</code>')
         .replace(/\n\n/g, '</p><p>')
-        .replace(/\n/g, '<br>');
+        .replace(/\n/g, '<br>'));
     
     return `
         ${Navbar()}
@@ -1328,13 +1376,47 @@ function cancelEdit() {
 }
 
 // ============ Data Loading ============
+// First page only; later pages come from loadMorePosts
 async function loadPosts() {
     try {
-        state.posts = await api('/posts');
+        const [page, featured, tags] = await Promise.all([
+            apiPage('/posts', { tag: state.activeTag }),
+            apiPage('/posts', { featured: true, limit: 1 }),
+            api('/tags?limit=20'),
+        ]);
+        state.posts = page.items;
+        state.nextCursor = page.next;
+        state.featuredPost = featured.items.find(p => p.featured) || null;
+        state.tags = tags;
     } catch (err) {
         console.error('Posts yüklenemedi:', err);
         state.posts = [];
+        state.nextCursor = null;
+    }
+}
+
+async function loadMorePosts() {
+    const cursor = state.nextCursor;
+    if (!cursor) return;
+    state.nextCursor = null;  // one request per cursor, however often it is clicked
+    document.getElementById('loadMore')?.setAttribute('disabled', '');
+    try {
+        const page = await apiPage('/posts', { tag: state.activeTag, cursor });
+        state.posts.push(...page.items);
+        state.nextCursor = page.next;
+    } catch (err) {
+        console.error('Posts yüklenemedi:', err);
+        state.nextCursor = cursor;
     }
+    const scroll = window.scrollY;
+    await render();
+    window.scrollTo(0, scroll);
+}
+
+async function filterByTag(name) {
+    state.activeTag = name;
+    await loadPosts();
+    await render();
 }
 
 async function loadPost(slug) {
@@ -1476,3 +1558,6 @@ window.showDeleteModal = showDeleteModal;
 window.closeDeleteModal = closeDeleteModal;
 window.confirmDelete = confirmDelete;
 window.cancelEdit = cancelEdit;
+// Listing
+window.loadMorePosts = loadMorePosts;
+window.filterByTag = filterByTag;
@@ -0,0 +1,8 @@
+"""The suite runs the app in-process against one throwaway SQLite database.
+
+Set up before any test module imports app.*, since settings and the
+engines are created at import time (see benchmarks.support).
+"""
+from benchmarks.support import use_temp_database
+
+use_temp_database(bcrypt_rounds="4", rate_limit_enabled="false")
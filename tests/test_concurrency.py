@@ -0,0 +1,33 @@
+"""benchmarks.sqlite_concurrency as tests: with the engine profile from
+app.database (WAL), reads neither wait for nor fail on an open write."""
+import asyncio
+from argparse import Namespace
+from sqlalchemy import func, insert, select
+from benchmarks.sqlite_concurrency import run_profile
+from benchmarks.support import app_client
+from app.database import read_engine, write_engine
+from app.models import Post, User
+
+def test_read_does_not_wait_for_an_open_write():
+    async def scenario():
+        async with app_client():
+            async with read_engine.connect() as conn:
+                before = await conn.scalar(select(func.count()).select_from(Post))
+            async with write_engine.begin() as writer:
+                author_id = await writer.scalar(select(User.id).limit(1))
+                await writer.execute(insert(Post).values(
+                    slug="kilitli-yazi", title="Kilitli", content="x", author_id=author_id,
+                ))
+                # The write lock is held until the block exits
+                async with read_engine.connect() as conn:
+                    during = await asyncio.wait_for(conn.scalar(select(func.count()).select_from(Post)), 1)
+                assert during == before
+            async with read_engine.connect() as conn:
+                assert await conn.scalar(select(func.count()).select_from(Post)) == before + 1
+
+    asyncio.run(scenario())
+
+def test_mixed_workload_has_no_lock_errors():
+    result = asyncio.run(run_profile("engine-profile", {}, Namespace(seconds=0.5, readers=4, writers=2)))
+    assert result["errors"] == {"read": 0, "write": 0}
+    assert result["reads_ms"]["count"] > 0 and result["writes_per_second"] > 0
@@ -0,0 +1,13 @@
+from app.content import render_content
+
+def test_self_closing_drop_tag_keeps_the_rest():
+    for tag in ("script", "style", "iframe"):
+        assert render_content(f"<p>a</p><{tag}/><p>rest</p>").html == "<p>a</p><p>rest</p>"
+
+def test_drop_tag_content_is_removed():
+    rendered = render_content("<p>a</p><script>alert(1)</script><p>b</p>")
+    assert rendered.html == "<p>a</p><p>b</p>"
+    assert "alert" not in rendered.excerpt
+
+def test_self_closing_allowed_tag():
+    assert render_content("<p>a<br/>b</p>").html == "<p>a<br>b</p>"
@@ -0,0 +1,22 @@
+import asyncio
+import json
+import os
+from benchmarks.support import app_client
+from app import metrics
+
+def health_requests(series) -> float:
+    return sum(value for labels, value in series if labels[0] == "/api/health")
+
+def test_idle_worker_flushes_at_window_end():
+    async def scenario():
+        async with app_client() as client:
+            for _ in range(3):
+                await client.get("/api/health")
+            await asyncio.sleep(metrics.FLUSH_INTERVAL + 0.1)
+            with open(os.path.join(metrics._metrics_dir(), f"{os.getpid()}.json")) as f:
+                written = json.load(f)["blog_http_requests_total"]
+            in_memory = metrics.registry.values["blog_http_requests_total"].items()
+            assert health_requests(written) == health_requests(in_memory) >= 3
+            assert metrics.collect().values["blog_http_requests_in_flight"][()] == 0
+
+    asyncio.run(scenario())
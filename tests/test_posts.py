@@ -0,0 +1,45 @@
+import asyncio
+from sqlalchemy import text
+from benchmarks.support import app_client
+from app.database import engine, init_db
+
+async def login(client) -> dict:
+    response = await client.post("/api/auth/login", json={"email": "demo@blog.com", "password": "demo123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def patch(client, auth, post: dict, insert: str) -> dict:
+    response = await client.patch(f"/api/posts/{post['slug']}", headers=auth, json={
+        "base_version": post["version"], "edits": [{"start": 0, "end": 0, "text": insert}],
+    })
+    assert response.status_code == 200
+    return (await client.get(f"/api/posts/{post['slug']}")).json()
+
+def test_patch_refreshes_only_derived_excerpts():
+    async def scenario():
+        async with app_client() as client:
+            auth = await login(client)
+            derived = (await client.post("/api/posts", headers=auth, json={
+                "title": "Türetilmiş özet", "content": "İlk cümle burada.",
+            })).json()
+            # Written by the author, even though it matches what would be derived
+            custom = (await client.post("/api/posts", headers=auth, json={
+                "title": "Yazar özeti", "content": "İlk cümle burada.", "excerpt": "İlk cümle burada.",
+            })).json()
+            assert (await patch(client, auth, derived, "Yeni "))["excerpt"] == "Yeni İlk cümle burada."
+            assert (await patch(client, auth, custom, "Yeni "))["excerpt"] == "İlk cümle burada."
+
+    asyncio.run(scenario())
+
+def test_upgrade_marks_author_excerpts():
+    async def scenario():
+        async with app_client() as client:
+            async with engine.begin() as conn:
+                await conn.execute(text("ALTER TABLE posts DROP COLUMN excerpt_custom"))
+            await init_db()
+            async with engine.connect() as conn:
+                flags = dict((await conn.execute(
+                    text("SELECT slug, excerpt_custom FROM posts WHERE slug IN ('typescript-tips', 'turetilmis-ozet')")
+                )).all())
+            assert flags == {"typescript-tips": 1, "turetilmis-ozet": 0}
+
+    asyncio.run(scenario())
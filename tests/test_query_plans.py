@@ -0,0 +1,26 @@
+"""benchmarks.query_plans as a test: every statement the API runs, explained
+against a small archive, must avoid full scans and sorts outside ALLOWED."""
+import asyncio
+from benchmarks.api import grow_archive
+from benchmarks.query_plans import explain, problems, record_statements, tour
+from benchmarks.support import app_client
+from app.database import engine, read_engine, write_engine
+
+def test_no_unexpected_scans_or_sorts():
+    async def scenario():
+        async with app_client() as client:
+            await grow_archive(1000)
+            statements = record_statements({engine, write_engine, read_engine})
+            await tour(client)
+            recorded = dict(statements)
+            statements.clear()
+            async with engine.connect() as conn:
+                return {
+                    statement: await conn.run_sync(explain, statement, parameters)
+                    for statement, parameters in recorded.items()
+                }
+
+    plans = asyncio.run(scenario())
+    assert len(plans) > 40
+    failures = {" ".join(statement.split()): found for statement, plan in plans.items() if (found := problems(statement, plan))}
+    assert failures == {}
@@ -0,0 +1,33 @@
+import asyncio
+from sqlalchemy import func, select, text
+from benchmarks.support import app_client
+from app.database import async_session, engine, init_db
+from app.jobs import run_due_jobs
+from app.models import Post
+from app.related import _archive_size
+
+async def archive_sizes() -> tuple[int, int]:
+    async with async_session() as db:
+        return await _archive_size(db), await db.scalar(select(func.count()).select_from(Post))
+
+def test_post_counter_follows_writes_and_upgrades():
+    async def scenario():
+        async with app_client() as client:
+            response = await client.post("/api/auth/login", json={"email": "demo@blog.com", "password": "demo123"})
+            auth = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            created = (await client.post("/api/posts", headers=auth, json={
+                "title": "Sayaç", "content": "Yeni yazı", "tags": ["Python"],
+            })).json()
+            await run_due_jobs()
+            kept, counted = await archive_sizes()
+            assert kept == counted
+            assert (await client.delete(f"/api/posts/{created['slug']}", headers=auth)).status_code == 204
+            await run_due_jobs()
+            assert await archive_sizes() == (counted - 1, counted - 1)
+            # A database from before the counter gets it filled on startup
+            async with engine.begin() as conn:
+                await conn.execute(text("DROP TABLE counters"))
+            await init_db()
+            assert await archive_sizes() == (counted - 1, counted - 1)
+
+    asyncio.run(scenario())
@@ -0,0 +1,39 @@
+import asyncio
+from sqlalchemy import text
+from benchmarks.support import app_client
+from app.database import engine, init_db
+from app.jobs import run_due_jobs
+
+async def login(client) -> dict:
+    response = await client.post("/api/auth/login", json={"email": "demo@blog.com", "password": "demo123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def search(client, query: str) -> list[dict]:
+    return (await client.get("/api/posts/search", params={"q": query})).json()
+
+def test_editor_markup_is_not_searchable():
+    async def scenario():
+        async with app_client() as client:
+            auth = await login(client)
+            await client.post("/api/posts", headers=auth, json={
+                "title": "Editör yazısı",
+                "content": '<p>Merhaba <strong>dünya</strong>, <a href="https://ornek.com">bağlantı</a></p><div>çiçekli</div>',
+            })
+            await run_due_jobs()
+            for markup in ("strong", "href", "div"):
+                assert await search(client, markup) == []
+            [hit] = await search(client, "dunya")
+            assert hit["snippet"] == "Merhaba <mark>dünya</mark>, bağlantı çiçekli"
+
+    asyncio.run(scenario())
+
+def test_init_db_fills_a_missing_index():
+    async def scenario():
+        async with app_client() as client:
+            assert await search(client, "typescript")
+            async with engine.begin() as conn:
+                await conn.execute(text("DROP TABLE posts_fts"))
+            await init_db()
+            assert await search(client, "typescript")
+
+    asyncio.run(scenario())
@@ -0,0 +1,32 @@
+import asyncio
+from benchmarks.support import app_client
+from app.database import async_session
+from app.tags import _tag_ids, resolve_tags
+
+async def resolve(names: list[str], commit: bool = True) -> list[tuple[int, str]]:
+    async with async_session() as db:
+        tags = [(tag.id, tag.name) for tag in await resolve_tags(db, names)]
+        await (db.commit() if commit else db.rollback())
+    return tags
+
+def test_rolled_back_tag_id_is_not_remembered():
+    async def scenario():
+        async with app_client():
+            [(rolled_back_id, _)] = await resolve(["geri-alınan"], commit=False)
+            assert "geri-alınan" not in _tag_ids
+            # SQLite hands the freed id to the next new tag
+            assert (await resolve(["başka-etiket"]))[0][0] == rolled_back_id
+            [(tag_id, name)] = await resolve(["geri-alınan"])
+            assert name == "geri-alınan" and _tag_ids[name] == tag_id != rolled_back_id
+
+    asyncio.run(scenario())
+
+def test_stale_cached_id_falls_back_to_upsert():
+    async def scenario():
+        async with app_client():
+            [(first_id, _), (second_id, _)] = await resolve(["bayat-1", "bayat-2"])
+            _tag_ids["bayat-1"] = second_id  # points at another tag
+            assert await resolve(["bayat-1"]) == [(first_id, "bayat-1")]
+            assert _tag_ids["bayat-1"] == first_id
+
+    asyncio.run(scenario())